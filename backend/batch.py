@@ -0,0 +1,125 @@
+"""Headless batch mode: run edit jobs read from a JSONL file or stdin.
+
+Each input line is one job, for example:
+
+    {"id": "promo", "prompt": "Cut the goals together", "videos": ["match.mp4"],
+     "output": "edited/promo.mp4", "render": "final", "render_mode": "smart"}
+
+Only "prompt" is required. Without "videos" the job edits already indexed
+videos. "render" is "final" (default), "preview" or "both". Jobs are
+approved automatically, and one JSON result record per job is appended to
+the results file as soon as the job finishes.
+"""
+import asyncio
+import json
+import os
+import sys
+import time
+from datetime import datetime, timezone
+from typing import Dict, IO, List
+
+from edit_generator import RENDER_MODES
+
+RENDER_CHOICES = ("final", "preview", "both")
+
+
+def read_jobs(stream: IO[str]) -> List[Dict]:
+    """Parse one job per non-empty line; lines that are not valid jobs become jobs carrying an error."""
+    jobs = []
+    for line_number, line in enumerate(stream, 1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            job = json.loads(line)
+            if not isinstance(job, dict):
+                raise ValueError("a job must be a JSON object")
+        except ValueError as e:
+            job = {"error": f"Invalid JSON: {str(e)}"}
+        job.setdefault("id", str(line_number))
+        jobs.append(job)
+    return jobs
+
+
+def validate_job(job: Dict) -> List[str]:
+    """Problems that keep a job from running; empty if it is valid."""
+    if job.get("error"):
+        return [job["error"]]
+    problems = []
+    if not isinstance(job.get("prompt"), str) or not job["prompt"].strip():
+        problems.append("missing prompt")
+    if job.get("render", "final") not in RENDER_CHOICES:
+        problems.append(f"render must be one of {', '.join(RENDER_CHOICES)}")
+    if job.get("render_mode") is not None and job["render_mode"] not in RENDER_MODES:
+        problems.append(f"render_mode must be one of {', '.join(RENDER_MODES)}")
+    videos = job.get("videos")
+    if videos is not None and not isinstance(videos, list):
+        # A string would otherwise be checked one character at a time
+        problems.append("videos must be a list of paths")
+        videos = None
+    for path in videos or []:
+        if not isinstance(path, str):
+            problems.append(f"video path must be a string: {path!r}")
+        elif not os.path.exists(path):
+            problems.append(f"video not found: {path}")
+    return problems
+
+
+async def run_job(editor, job: Dict, semaphore: asyncio.Semaphore) -> Dict:
+    """Run one job through process_edit and build its result record."""
+    record = {"id": job["id"], "prompt": job.get("prompt")}
+    problems = validate_job(job)
+    if problems:
+        record.update(status="invalid", error="; ".join(problems))
+        return record
+
+    async with semaphore:
+        record["started_at"] = datetime.now(timezone.utc).isoformat()
+        started = time.perf_counter()
+        videos = [os.path.abspath(path) for path in job.get("videos") or []]
+        try:
+            result = await editor.process_edit(
+                job["prompt"].strip(), videos, skip_upload=not videos,
+                approve=job.get("render", "final"), output_path=job.get("output"),
+                render_mode=job.get("render_mode"),
+            )
+        except Exception as e:
+            result = {"status": "error", "error": str(e)}
+        record["wall_seconds"] = round(time.perf_counter() - started, 3)
+    record.update(result)
+    return record
+
+
+async def run_batch(editor, jobs: List[Dict], results: IO[str], concurrency: int = 2) -> int:
+    """Run jobs in file order, at most concurrency at a time, writing a result line per job.
+
+    Returns:
+        int: Number of jobs that did not finish with status "done"
+    """
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+    # Tasks are created in file order, so jobs start in that order (as_completed
+    # would schedule bare coroutines from a set); later jobs may rely on earlier ones
+    tasks = [asyncio.create_task(run_job(editor, job, semaphore)) for job in jobs]
+    failed = 0
+    for finished in asyncio.as_completed(tasks):
+        record = await finished
+        if record["status"] != "done":
+            failed += 1
+        results.write(json.dumps(record, default=str) + "\n")
+        results.flush()
+    return failed
+
+
+def run_batch_cli(editor, jobs_path: str, results_path: str, concurrency: int) -> int:
+    """Read jobs from jobs_path ("-" for stdin) and run them; returns the exit status."""
+    if jobs_path == "-":
+        jobs = read_jobs(sys.stdin)
+    else:
+        with open(jobs_path) as f:
+            jobs = read_jobs(f)
+    print(f"Running {len(jobs)} jobs, {concurrency} at a time; results go to {results_path}")
+
+    with open(results_path, "a") as results:
+        failed = asyncio.run(run_batch(editor, jobs, results, concurrency))
+    print(f"\n{len(jobs) - failed} of {len(jobs)} jobs done; results written to {results_path}")
+    return 1 if failed else 0
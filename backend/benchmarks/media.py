@@ -0,0 +1,44 @@
+from pathlib import Path
+from typing import List, Tuple
+
+import ffmpeg
+
+# GOP length of the synthetic videos, so copy and smart renders see realistic keyframes
+KEYFRAME_INTERVAL = 2
+
+
+def parse_resolution(resolution: str) -> Tuple[int, int]:
+    """Parse a "WIDTHxHEIGHT" string such as "1280x720"."""
+    width, _, height = resolution.lower().partition("x")
+    return int(width), int(height)
+
+
+def synthetic_video(output_dir: str, duration: float, resolution: str, fps: int = 30) -> str:
+    """Generate an H.264/AAC test video from the lavfi testsrc2 and sine sources.
+
+    Files are named after their parameters and reused when they already
+    exist, so repeated benchmark runs do not pay for generation.
+    """
+    width, height = parse_resolution(resolution)
+    output_path = Path(output_dir) / f"testsrc_{width}x{height}_{fps}fps_{duration:g}s.mp4"
+    if output_path.exists():
+        return str(output_path)
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+
+    video = ffmpeg.input(f"testsrc2=size={width}x{height}:rate={fps}:duration={duration}", f="lavfi")
+    audio = ffmpeg.input(f"sine=frequency=440:sample_rate=48000:duration={duration}", f="lavfi")
+    stream = ffmpeg.output(
+        video, audio, str(output_path),
+        vcodec="libx264", preset="veryfast", pix_fmt="yuv420p", g=fps * KEYFRAME_INTERVAL,
+        acodec="aac", audio_bitrate="128k", shortest=None,
+    )
+    ffmpeg.run(stream, overwrite_output=True, quiet=True)
+    return str(output_path)
+
+
+def synthetic_videos(output_dir: str, duration: float, resolution: str, count: int) -> List[str]:
+    """Generate count test videos, each a second longer than the last.
+
+    Their contents differ, so no upload is skipped as a duplicate of another.
+    """
+    return [synthetic_video(output_dir, duration + i, resolution) for i in range(count)]
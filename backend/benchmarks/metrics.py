@@ -0,0 +1,134 @@
+import os
+import resource
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterator, Optional
+
+# Seconds between samples of the process's resident set size
+RSS_SAMPLE_INTERVAL = 0.02
+
+
+def _maxrss_bytes(who: int) -> int:
+    """Lifetime peak RSS from getrusage; Linux reports KiB, macOS bytes."""
+    peak = resource.getrusage(who).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def _current_rss() -> Optional[int]:
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def _bytes_written() -> Optional[int]:
+    """Bytes passed to write() by this process and its reaped children (Linux only)."""
+    try:
+        with open("/proc/self/io") as f:
+            for line in f:
+                if line.startswith("wchar:"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return None
+
+
+def _cpu_seconds() -> float:
+    """User and system CPU time of this process plus its finished FFmpeg children."""
+    total = 0.0
+    for who in (resource.RUSAGE_SELF, resource.RUSAGE_CHILDREN):
+        usage = resource.getrusage(who)
+        total += usage.ru_utime + usage.ru_stime
+    return total
+
+
+def _tree_size(root: Path) -> int:
+    total = 0
+    for path in root.rglob("*"):
+        try:
+            if path.is_file():
+                total += path.stat().st_size
+        except OSError:
+            pass
+    return total
+
+
+class _RssSampler(threading.Thread):
+    """Tracks the peak RSS of this process while a stage runs."""
+
+    def __init__(self):
+        super().__init__(daemon=True)
+        self.peak = _current_rss() or 0
+        self._stop_event = threading.Event()
+
+    def run(self) -> None:
+        while not self._stop_event.wait(RSS_SAMPLE_INTERVAL):
+            rss = _current_rss()
+            if rss is None:
+                return
+            self.peak = max(self.peak, rss)
+
+    def stop(self) -> int:
+        self._stop_event.set()
+        self.join()
+        rss = _current_rss()
+        if rss is None:
+            # No /proc to sample; fall back to the lifetime high-water mark
+            return _maxrss_bytes(resource.RUSAGE_SELF)
+        return max(self.peak, rss)
+
+
+class StageMeter:
+    """Measures wall time, CPU time, peak RSS and bytes written per pipeline stage.
+
+    CPU time includes FFmpeg subprocesses once they have exited. The RSS of
+    FFmpeg is only available as the peak of any child so far, so it is
+    reported separately from the sampled peak of the Python process.
+    Bytes written count every write() call; disk_growth_bytes is the net
+    size change of work_dir, which misses temporary files already removed.
+    """
+
+    def __init__(self, work_dir: str):
+        self.work_dir = Path(work_dir)
+        self.stages: Dict[str, Dict] = {}
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        sampler = _RssSampler()
+        sampler.start()
+        size_before = _tree_size(self.work_dir)
+        written_before = _bytes_written()
+        cpu_before = _cpu_seconds()
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            wall = time.perf_counter() - started
+            cpu = _cpu_seconds() - cpu_before
+            written_after = _bytes_written()
+            self.stages[name] = {
+                "wall_seconds": round(wall, 4),
+                "cpu_seconds": round(cpu, 4),
+                "peak_rss_bytes": sampler.stop(),
+                "children_peak_rss_bytes": _maxrss_bytes(resource.RUSAGE_CHILDREN),
+                "bytes_written": (written_after - written_before
+                                  if written_before is not None and written_after is not None else None),
+                "disk_growth_bytes": _tree_size(self.work_dir) - size_before,
+            }
+
+    def total(self) -> Dict:
+        """Sum of the stages, with peaks taken as the maximum."""
+        stages = list(self.stages.values())
+        written = [stage["bytes_written"] for stage in stages]
+        return {
+            "wall_seconds": round(sum(stage["wall_seconds"] for stage in stages), 4),
+            "cpu_seconds": round(sum(stage["cpu_seconds"] for stage in stages), 4),
+            "peak_rss_bytes": max((stage["peak_rss_bytes"] for stage in stages), default=0),
+            "children_peak_rss_bytes": max((stage["children_peak_rss_bytes"] for stage in stages), default=0),
+            "bytes_written": sum(written) if None not in written else None,
+            "disk_growth_bytes": sum(stage["disk_growth_bytes"] for stage in stages),
+        }
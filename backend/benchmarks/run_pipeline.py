@@ -0,0 +1,255 @@
+"""End-to-end pipeline benchmark on synthetic media.
+
+Runs the ingest, analyze, search, plan and render stages of
+VideoEditor.process_edit against the offline service stand-ins (see
+offline.py) for every combination of the requested durations and
+resolutions, and writes per-stage metrics as JSON.
+
+Usage, from the backend directory:
+
+    python -m benchmarks.run_pipeline --durations 10,30 --resolutions 640x360,1280x720
+    python -m benchmarks.run_pipeline --output new.json --compare baseline.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
+
+from benchmarks.media import synthetic_videos
+from benchmarks.metrics import StageMeter
+from benchmarks.startup import measure_startup
+from tracing import tracer
+
+DEFAULT_PROMPT = "Make a short highlight reel of the most colourful moments"
+
+# Spans of process_edit measured as benchmark stages; a preview render is "preview"
+STAGE_SPANS = {
+    "ingest": "ingest",
+    "analyze_prompt": "analyze",
+    "search": "search",
+    "generate_prompt": "plan",
+    "render": "render",
+}
+
+# Offline settings used unless the environment overrides them; indexing and
+# polling are shortened so ingest measures our overhead, not a fixed wait
+OFFLINE_DEFAULTS = {
+    "REDUCT_OFFLINE": "1",
+    "OFFLINE_LATENCY": "0.05",
+    "OFFLINE_INDEX_TIME": "0.5",
+    "INDEX_POLL_INTERVAL": "0.2",
+    "SEARCH_TOP_K": "6",
+}
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"], cwd=BACKEND_DIR, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_scenario(app, prompt: str, video_paths: List[str], render_mode: str,
+                 workers: int, preview: bool) -> Dict:
+    """Run VideoEditor.process_edit once on fresh offline services and measure each stage.
+
+    Stages are metered from the spans process_edit opens for them (see
+    STAGE_SPANS), so the benchmark runs exactly the pipeline users run.
+    """
+    # Videos and metadata of earlier scenarios must not show up in this one's searches
+    app.reset_offline_services()
+    editor = app.VideoEditor(render_mode=render_mode, render_workers=workers)
+    meter = StageMeter(os.getcwd())
+
+    def meter_stage(span):
+        stage = STAGE_SPANS.get(span.name)
+        if stage == "render" and span.attributes.get("preview"):
+            stage = "preview"
+        return meter.stage(stage) if stage else None
+
+    tracer.add_hook(meter_stage)
+    try:
+        result = asyncio.run(editor.process_edit(prompt, video_paths,
+                                                 approve="both" if preview else "final"))
+    finally:
+        tracer.remove_hook(meter_stage)
+
+    failed = [path for path in video_paths if editor.video_metadata[path].status != app.VideoStatus.READY]
+    if failed:
+        raise RuntimeError(f"Ingest failed for {', '.join(failed)}")
+    if result["status"] != "done":
+        raise RuntimeError(f"Edit finished with status {result['status']}: {result.get('error', '')}")
+
+    return {
+        "clips": result["clips"],
+        "trims": result["trims"],
+        "output_bytes": os.path.getsize(result["output"]),
+        "stages": meter.stages,
+        "total": meter.total(),
+    }
+
+
+def compare(results: Dict, baseline: Dict, threshold: float) -> List[str]:
+    """Print wall and CPU time against a baseline run; return the regressions found."""
+    baseline_scenarios = {scenario["name"]: scenario for scenario in baseline.get("scenarios", [])}
+    regressions = []
+    print(f"\nCompared with {baseline.get('commit') or 'baseline'}:")
+    old_import = (baseline.get("startup") or {}).get("import_ms")
+    new_import = (results.get("startup") or {}).get("import_ms")
+    if old_import and new_import is not None:
+        change = (new_import - old_import) / old_import
+        flag = ""
+        if change > threshold:
+            flag = "  <-- regression"
+            regressions.append(f"startup import_ms {change:+.1%}")
+        print(f"{'startup':<28} {'import':<8} {'import_ms':<13} "
+              f"{old_import:8.1f} -> {new_import:8.1f} ({change:+.1%}){flag}")
+    for scenario in results["scenarios"]:
+        before = baseline_scenarios.get(scenario["name"])
+        if not before:
+            print(f"{scenario['name']}: not in baseline")
+            continue
+        for stage, metrics in list(scenario["stages"].items()) + [("total", scenario["total"])]:
+            old = before["stages"].get(stage) if stage != "total" else before["total"]
+            if not old:
+                continue
+            for metric in ("wall_seconds", "cpu_seconds"):
+                if not old[metric]:
+                    continue
+                change = (metrics[metric] - old[metric]) / old[metric]
+                flag = ""
+                if change > threshold:
+                    flag = "  <-- regression"
+                    regressions.append(f"{scenario['name']} {stage} {metric} {change:+.1%}")
+                print(f"{scenario['name']:<28} {stage:<8} {metric:<13} "
+                      f"{old[metric]:8.3f} -> {metrics[metric]:8.3f} ({change:+.1%}){flag}")
+    return regressions
+
+
+def print_summary(results: Dict) -> None:
+    startup = results.get("startup") or {}
+    if startup.get("import_ms") is not None:
+        print(f"\nStartup: import main took {startup['import_ms']} ms")
+        if startup["eagerly_imported"]:
+            print(f"Imported at startup instead of on first use: {', '.join(startup['eagerly_imported'])}")
+        if startup.get("created_at_import"):
+            print(f"Written to the working directory at import: {', '.join(startup['created_at_import'])}")
+    print(f"\n{'scenario':<28} {'stage':<8} {'wall s':>8} {'cpu s':>8} {'rss MB':>8} {'written MB':>11}")
+    for scenario in results["scenarios"]:
+        for stage, metrics in list(scenario["stages"].items()) + [("total", scenario["total"])]:
+            written = metrics["bytes_written"]
+            print(f"{scenario['name']:<28} {stage:<8} {metrics['wall_seconds']:8.3f} "
+                  f"{metrics['cpu_seconds']:8.3f} {metrics['peak_rss_bytes'] / 1024 ** 2:8.1f} "
+                  f"{written / 1024 ** 2 if written is not None else float('nan'):11.2f}")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Benchmark the edit pipeline on synthetic media.")
+    parser.add_argument("--durations", default="10,30", help="Comma-separated video durations in seconds")
+    parser.add_argument("--resolutions", default="640x360,1280x720", help="Comma-separated WIDTHxHEIGHT sizes")
+    parser.add_argument("--videos", type=int, default=2, help="Videos ingested per scenario")
+    parser.add_argument("--prompt", default=DEFAULT_PROMPT, help="Edit prompt given to the pipeline")
+    parser.add_argument("--render-mode", default=os.getenv("RENDER_MODE", "reencode"),
+                        help='"reencode", "copy", "smart" or "filter"')
+    parser.add_argument("--workers", type=int, default=int(os.getenv("RENDER_WORKERS", "1")),
+                        help="Trim segments encoded concurrently")
+    parser.add_argument("--preview", action="store_true", help="Also benchmark a preview render")
+    parser.add_argument("--media-dir", default=os.path.join(tempfile.gettempdir(), "reduct-bench-media"),
+                        help="Where synthetic videos are generated and reused")
+    parser.add_argument("--output", default="benchmark_results.json", help="JSON results file")
+    parser.add_argument("--compare", help="Baseline JSON results to compare against")
+    parser.add_argument("--threshold", type=float, default=0.10,
+                        help="Relative slowdown against the baseline reported as a regression")
+    parser.add_argument("--keep", action="store_true", help="Keep the work directory with rendered files")
+    args = parser.parse_args()
+
+    for name, value in OFFLINE_DEFAULTS.items():
+        os.environ.setdefault(name, value)
+    if os.environ["REDUCT_OFFLINE"] != "1":
+        parser.error("benchmarks only run against the offline services (REDUCT_OFFLINE=1)")
+
+    output_path = os.path.abspath(args.output)
+    try:
+        startup = measure_startup()
+    except RuntimeError as e:
+        print(f"Warning: Could not measure startup: {str(e)}")
+        startup = {"error": str(e)}
+    media_dir = os.path.abspath(args.media_dir)
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+
+    durations = [float(duration) for duration in args.durations.split(",")]
+    resolutions = [resolution.strip() for resolution in args.resolutions.split(",")]
+
+    # Caches, temp files and renders are relative to the working directory,
+    # so each run starts cold in a directory of its own
+    start_dir = os.getcwd()
+    work_dir = tempfile.mkdtemp(prefix="reduct-bench-")
+    os.chdir(work_dir)
+    try:
+        import main as app
+
+        results = {
+            "commit": _git_commit(),
+            "created_at": datetime.now(timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "settings": {
+                "render_mode": args.render_mode,
+                "workers": args.workers,
+                "videos": args.videos,
+                "prompt": args.prompt,
+                **{name: os.environ[name] for name in OFFLINE_DEFAULTS},
+            },
+            "startup": startup,
+            "scenarios": [],
+        }
+        for resolution in resolutions:
+            for duration in durations:
+                name = f"{resolution}_{duration:g}s_x{args.videos}"
+                print(f"\n=== {name} ===")
+                video_paths = synthetic_videos(media_dir, duration, resolution, args.videos)
+                scenario = run_scenario(app, args.prompt, video_paths, args.render_mode,
+                                        args.workers, args.preview)
+                results["scenarios"].append({
+                    "name": name, "duration": duration, "resolution": resolution, **scenario,
+                })
+    finally:
+        os.chdir(start_dir)
+        if args.keep:
+            print(f"\nWork directory kept at {work_dir}")
+        else:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+    with open(output_path, "w") as f:
+        json.dump(results, f, indent=2)
+    print_summary(results)
+    print(f"\nResults written to {output_path}")
+
+    if baseline:
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print(f"\n{len(regressions)} regression(s) above {args.threshold:.0%}:")
+            for regression in regressions:
+                print(f"- {regression}")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
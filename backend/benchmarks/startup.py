@@ -0,0 +1,107 @@
+"""CLI startup benchmark based on python -X importtime.
+
+Imports main.py in a fresh interpreter, reports the import time and the
+slowest modules, and checks that the remote service SDKs are not imported
+and nothing is written to the working directory until a command needs it.
+
+Usage, from the backend directory:
+
+    python -m benchmarks.startup --budget-ms 300
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Dict, List
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Top-level packages that must only be imported on first use of their client
+DEFERRED_MODULES = ("twelvelabs", "google.genai", "pymongo")
+
+
+def _parse_importtime(stderr: str) -> List[Dict]:
+    """Parse "import time: self [us] | cumulative | imported package" lines."""
+    modules = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "imported package" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        modules.append({
+            "module": name.strip(),
+            "self_us": int(self_us),
+            "cumulative_us": int(cumulative_us),
+        })
+    return modules
+
+
+def measure_startup(module: str = "main", top: int = 10) -> Dict:
+    """Import module in a fresh interpreter and measure where the time goes."""
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [BACKEND_DIR, os.getenv("PYTHONPATH")])))
+    # Imported from an empty directory, so anything written at import time shows up
+    with tempfile.TemporaryDirectory(prefix="reduct-startup-") as work_dir:
+        started = time.perf_counter()
+        completed = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+            cwd=work_dir, env=env, capture_output=True, text=True,
+        )
+        wall = time.perf_counter() - started
+        created = sorted(os.listdir(work_dir))
+    if completed.returncode != 0:
+        errors = [line for line in completed.stderr.splitlines() if not line.startswith("import time:")]
+        raise RuntimeError(f"Importing {module} failed:\n" + "\n".join(errors))
+
+    modules = _parse_importtime(completed.stderr)
+    imported = {entry["module"] for entry in modules}
+    total = next((entry["cumulative_us"] for entry in modules if entry["module"] == module), None)
+    return {
+        "module": module,
+        "import_ms": round(total / 1000, 2) if total is not None else None,
+        "interpreter_wall_ms": round(wall * 1000, 2),
+        "slowest": sorted(
+            (entry for entry in modules if "." not in entry["module"]),
+            key=lambda entry: entry["cumulative_us"], reverse=True,
+        )[:top],
+        "eagerly_imported": [
+            name for name in DEFERRED_MODULES
+            if name in imported or any(other.startswith(name + ".") for other in imported)
+        ],
+        "created_at_import": created,
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Measure how long importing the CLI takes.")
+    parser.add_argument("--module", default="main", help="Module to import")
+    parser.add_argument("--budget-ms", type=float, default=500.0,
+                        help="Import time above which the check fails")
+    parser.add_argument("--json", action="store_true", help="Print the measurement as JSON")
+    args = parser.parse_args()
+
+    result = measure_startup(args.module)
+    if args.json:
+        print(json.dumps(result, indent=2))
+    else:
+        print(f"import {result['module']}: {result['import_ms']} ms "
+              f"({result['interpreter_wall_ms']} ms including interpreter start)")
+        for entry in result["slowest"]:
+            print(f"  {entry['module']:<28} {entry['cumulative_us'] / 1000:8.2f} ms")
+
+    failed = False
+    if result["eagerly_imported"]:
+        print(f"Imported at startup instead of on first use: {', '.join(result['eagerly_imported'])}")
+        failed = True
+    if result["created_at_import"]:
+        print(f"Written to the working directory at import: {', '.join(result['created_at_import'])}")
+        failed = True
+    if result["import_ms"] is not None and result["import_ms"] > args.budget_ms:
+        print(f"Startup budget exceeded: {result['import_ms']} ms > {args.budget_ms} ms")
+        failed = True
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
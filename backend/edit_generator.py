@@ -1,47 +1,676 @@
+import contextvars
 import ffmpeg
+import subprocess
+import threading
 import uuid
+from bisect import bisect_left
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_EXCEPTION
 from pathlib import Path
 import os
+from typing import Callable, Dict, List, Optional, Tuple, Union
+
+from media_info import MediaInfoStore, keyframe_times
+from progress import ProgressUpdate, RenderProgress
+from proxy import PREVIEW_HEIGHT
+from render_cache import SegmentCache
+from tracing import tracer
+
+# Render modes supported by generate_ffmpeg_from_plan
+RENDER_MODES = ("reencode", "copy", "smart", "filter")
+
+# A cut point this close (in seconds) to a keyframe is treated as landing on it
+KEYFRAME_TOLERANCE = 0.05
+
+# Output settings of the final encode and of fast preview renders
+FINAL_ENCODE = {"vcodec": "libx264", "acodec": "aac", "audio_bitrate": "192k"}
+PREVIEW_ENCODE = {"vcodec": "libx264", "preset": "ultrafast", "crf": 32,
+                  "acodec": "aac", "audio_bitrate": "96k"}
+# Decoder shortcuts for preview inputs, which are scaled down anyway
+PREVIEW_DECODE = {"skip_loop_filter": "all"}
+
+# Bumped when the way segments are encoded changes, so older cached ones are not reused
+SEGMENT_VERSION = 2
+
+# Encoders that can produce edge frames compatible with a copied middle section
+SMART_ENCODERS = {"h264": "libx264", "hevc": "libx265"}
+
+
+def time_to_seconds(time_str: str) -> float:
+    """Convert an "HH:MM:SS" timestamp to seconds."""
+    h, m, s = map(float, time_str.split(':'))
+    return h * 3600 + m * 60 + s
+
+
+def _thread_args(threads: Optional[int]) -> Dict:
+    """FFmpeg output arguments limiting the encoder to the given thread count."""
+    return {"threads": threads} if threads else {}
+
+
+class _ProcessGroup:
+    """FFmpeg processes of one parallel render, so a failure can stop them all."""
+
+    def __init__(self):
+        self._processes: List[subprocess.Popen] = []
+        self._cancelled = False
+        self._lock = threading.Lock()
+
+    def popen(self, args: List[str], **kwargs) -> subprocess.Popen:
+        """Start an FFmpeg process in the group, unless the group was cancelled."""
+        with self._lock:
+            if self._cancelled:
+                raise RuntimeError("Render cancelled after another segment failed")
+            process = subprocess.Popen(args, **kwargs)
+            self._processes = [p for p in self._processes if p.poll() is None] + [process]
+        return process
+
+    def cancel(self) -> None:
+        """Terminate the running processes and refuse to start new ones."""
+        with self._lock:
+            self._cancelled = True
+            processes = list(self._processes)
+        for process in processes:
+            if process.poll() is None:
+                process.terminate()
+
+
+# Process group the FFmpeg runs of the current parallel render belong to
+_process_group: contextvars.ContextVar[Optional[_ProcessGroup]] = contextvars.ContextVar(
+    "process_group", default=None)
+
+
+def _run(stream, label: str, duration: float, progress: Optional[RenderProgress] = None) -> None:
+    """Run an FFmpeg stream spec, reporting its progress when a tracker is given."""
+    output_path = ffmpeg.get_args(stream)[-1]
+    group = _process_group.get()
+    with tracer.span("ffmpeg", label=label, media_seconds=round(duration, 3)) as span:
+        if progress is not None:
+            progress.run(stream, label, duration, **({"popen": group.popen} if group else {}))
+        elif group is not None:
+            process = group.popen(ffmpeg.compile(stream, overwrite_output=True))
+            if process.wait() != 0:
+                raise ffmpeg.Error("ffmpeg", None, None)
+        else:
+            ffmpeg.run(stream, overwrite_output=True)
+        if os.path.exists(output_path):
+            span.set(output_bytes=os.path.getsize(output_path))
+
+
+def is_on_keyframe(keyframes: Optional[List[float]], timestamp: float,
+                   tolerance: float = KEYFRAME_TOLERANCE) -> bool:
+    """Check whether a timestamp falls on (or within tolerance of) a keyframe.
+
+    keyframes is None for all-intra sources, where every frame is one.
+    """
+    if keyframes is None:
+        return True
+    i = bisect_left(keyframes, timestamp)
+    for j in (i - 1, i):
+        if 0 <= j < len(keyframes) and abs(keyframes[j] - timestamp) <= tolerance:
+            return True
+    return False
+
+
+def _copy_segment(input_path: str, segment_path: Path, start_sec: float, end_sec: float,
+                  progress: Optional[RenderProgress] = None) -> None:
+    """Cut a segment without re-encoding; start_sec must be on a keyframe."""
+    stream = ffmpeg.input(input_path, ss=start_sec, t=end_sec - start_sec)
+    stream = ffmpeg.output(stream, str(segment_path), c='copy',
+                           avoid_negative_ts='make_zero')
+    _run(stream, segment_path.name, end_sec - start_sec, progress)
+
+
+def _reencode_segment(input_path: str, segment_path: Path, start_sec: float, end_sec: float,
+                      threads: Optional[int] = None,
+                      progress: Optional[RenderProgress] = None) -> None:
+    """Cut a frame-accurate segment by seeking the input and re-encoding it."""
+    stream = ffmpeg.input(input_path, ss=start_sec, t=end_sec - start_sec)
+    stream = ffmpeg.output(stream, str(segment_path),
+                           acodec='aac',
+                           vcodec='libx264',
+                           audio_bitrate='192k',
+                           **_thread_args(threads))
+    _run(stream, segment_path.name, end_sec - start_sec, progress)
+
+
+def _encoder_profile_args(encoder: str, stream_info: Dict) -> Dict:
+    """Encoder arguments matching the source's profile and level.
+
+    FFprobe reports profiles as e.g. "High" or "Main 10" and levels as
+    level_idc (41 for H.264 level 4.1, 123 for HEVC level 4.1).
+    """
+    args = {}
+    profile = (stream_info.get("profile") or "").lower()
+    level = stream_info.get("level")
+    if encoder == "libx264":
+        profile = profile.replace("constrained ", "").replace(":", "").replace(" ", "")
+        if profile in ("baseline", "main", "high", "high10", "high422", "high444predictive"):
+            args["profile:v"] = profile.replace("predictive", "")
+        if isinstance(level, int) and level > 0:
+            args["level"] = f"{level / 10:g}"
+    elif encoder == "libx265":
+        profile = profile.replace(" ", "")
+        if profile in ("main", "main10", "mainstillpicture"):
+            args["profile:v"] = profile
+        if isinstance(level, int) and level > 0:
+            args["x265-params"] = f"level-idc={level / 30:g}"
+    return args
+
+
+def _encode_piece(input_path: str, piece_path: Path, start_sec: float, end_sec: float,
+                  stream_info: Dict, threads: Optional[int] = None,
+                  progress: Optional[RenderProgress] = None, audio: bool = True) -> None:
+    """Re-encode a piece as MPEG-TS with the source's video codec parameters.
+
+    Codec, pix_fmt, profile and level follow the source, so the piece can sit
+    next to stream-copied GOPs. Pieces of a smart segment are encoded without
+    audio (audio=False); the segment's audio is encoded once when they are joined.
+    """
+    encoder = SMART_ENCODERS.get(stream_info.get("vcodec"), "libx264")
+    output_args = {
+        "vcodec": encoder,
+        "crf": 18,
+        "format": "mpegts",
+        **_encoder_profile_args(encoder, stream_info),
+        **_thread_args(threads),
+    }
+    if stream_info.get("pix_fmt"):
+        output_args["pix_fmt"] = stream_info["pix_fmt"]
+    if audio:
+        output_args.update(_audio_args(stream_info))
+    else:
+        output_args["an"] = None
+    stream = ffmpeg.input(input_path, ss=start_sec, t=end_sec - start_sec)
+    stream = ffmpeg.output(stream, str(piece_path), **output_args)
+    _run(stream, piece_path.name, end_sec - start_sec, progress)
+
+
+def _copy_piece(input_path: str, piece_path: Path, start_sec: float, end_sec: float,
+                progress: Optional[RenderProgress] = None) -> None:
+    """Stream-copy the video of a keyframe-aligned piece as MPEG-TS, without audio."""
+    stream = ffmpeg.input(input_path, ss=start_sec, t=end_sec - start_sec)
+    stream = ffmpeg.output(stream, str(piece_path), vcodec="copy", an=None, format="mpegts")
+    _run(stream, piece_path.name, end_sec - start_sec, progress)
+
+
+def _audio_args(stream_info: Dict) -> Dict:
+    """AAC output arguments keeping the source's sample rate and channel count."""
+    output_args = {"acodec": "aac", "audio_bitrate": "192k"}
+    if stream_info.get("sample_rate"):
+        output_args["ar"] = stream_info["sample_rate"]
+    if stream_info.get("channels"):
+        output_args["ac"] = stream_info["channels"]
+    return output_args
+
+
+def _smart_segment(input_path: str, segment_path: Path, start_sec: float, end_sec: float,
+                   keyframes: Optional[List[float]], stream_info: Dict,
+                   threads: Optional[int] = None,
+                   progress: Optional[RenderProgress] = None) -> str:
+    """Render a segment by re-encoding only its partial GOPs.
+
+    The frames between the requested start and the first keyframe, and
+    between the last keyframe and the requested end, are re-encoded; the GOPs
+    in between are stream-copied. The video pieces are joined into an
+    MPEG-TS file at segment_path, together with the range's audio encoded
+    in a single pass. For an all-intra source (keyframes is None) the whole
+    range is copied.
+
+    Returns:
+        str: "copy", "smart" or "reencode" depending on how much was encoded
+    """
+    # Without a matching encoder the copied GOPs cannot be mixed with new ones
+    if stream_info.get("vcodec") not in SMART_ENCODERS:
+        _encode_piece(input_path, segment_path, start_sec, end_sec, stream_info, threads, progress)
+        return "reencode"
+
+    # (start, end, copy) ranges making up the segment
+    ranges = []
+    if keyframes is None:
+        ranges.append((start_sec, end_sec, True))
+    else:
+        i = bisect_left(keyframes, start_sec - KEYFRAME_TOLERANCE)
+        inner = [k for k in keyframes[i:] if k < end_sec - KEYFRAME_TOLERANCE]
+        if not inner:
+            # The whole segment lies inside a single GOP
+            _encode_piece(input_path, segment_path, start_sec, end_sec, stream_info, threads,
+                          progress)
+            return "reencode"
+
+        first_kf = max(inner[0], start_sec)
+        last_kf = max(inner[-1], first_kf)
+        end_aligned = is_on_keyframe(keyframes, end_sec)
+
+        if first_kf - start_sec > KEYFRAME_TOLERANCE:
+            ranges.append((start_sec, first_kf, False))
+        copy_end = end_sec if end_aligned else last_kf
+        if copy_end > first_kf:
+            ranges.append((first_kf, copy_end, True))
+        if not end_aligned:
+            ranges.append((last_kf, end_sec, False))
+
+    pieces = []
+    parts_file = segment_path.with_name(f"{segment_path.stem}_parts.txt")
+    try:
+        for index, (piece_start, piece_end, copy) in enumerate(ranges):
+            piece_path = segment_path.with_name(f"{segment_path.stem}_part{index}.ts")
+            if copy:
+                _copy_piece(input_path, piece_path, piece_start, piece_end, progress)
+            else:
+                _encode_piece(input_path, piece_path, piece_start, piece_end, stream_info, threads,
+                              progress, audio=False)
+            pieces.append(piece_path)
+
+        with open(parts_file, "w") as f:
+            for piece_path in pieces:
+                f.write(f"file '{piece_path.absolute()}'\n")
+        # The video pieces are copied; the audio of the whole range is encoded
+        # in one go, so no AAC priming gaps appear at the piece boundaries
+        streams = [ffmpeg.input(str(parts_file), format='concat', safe=0).video]
+        output_args = {"vcodec": "copy", "format": "mpegts"}
+        if stream_info.get("acodec"):
+            streams.append(ffmpeg.input(input_path, ss=start_sec, t=end_sec - start_sec).audio)
+            output_args.update(_audio_args(stream_info))
+        stream = ffmpeg.output(*streams, str(segment_path), **output_args)
+        # Stitching copies the video, so it carries no weight in overall progress
+        _run(stream, segment_path.name, 0.0, progress)
+    finally:
+        for piece_path in pieces + [parts_file]:
+            if piece_path.exists():
+                piece_path.unlink()
+
+    if all(copy for _, _, copy in ranges):
+        return "copy"
+    return "smart"
+
+
+def ordered_trims(edit_plan: dict) -> List[Dict]:
+    """Return the plan's trim actions in concat order.
+
+    Trims missing a start, end or output are skipped. Without a concat
+    action the trims are returned in plan order.
+    """
+    actions = edit_plan.get("actions", [])
+    trims = {}
+    for action in actions:
+        if action["type"] == "trim" and action.get("start") and action.get("end") and action.get("output"):
+            trims[action["output"]] = action
+
+    for action in actions:
+        if action["type"] == "concat" and action.get("segments"):
+            segments = sorted(action["segments"], key=lambda x: x["position"])
+            return [trims[segment["file"]] for segment in segments if segment["file"] in trims]
+    return list(trims.values())
+
+
+def source_path(action: Dict, input_path: Union[str, Dict[str, str]]) -> str:
+    """Resolve the source file a trim action is cut from.
+
+    input_path is either a single file used for every trim, or a mapping of
+    video_id to file that is looked up with the trim's "video_id".
+    """
+    if isinstance(input_path, str):
+        return input_path
+    video_id = action.get("video_id")
+    if video_id in input_path:
+        return input_path[video_id]
+    if video_id is None and len(input_path) == 1:
+        return next(iter(input_path.values()))
+    raise ValueError(f"No source video for trim {action.get('output')} (video_id={video_id!r})")
+
+
+def _stream_signature(stream_info: Dict) -> Tuple:
+    """Parameters that must match for segments to be joined without re-encoding."""
+    return tuple(stream_info.get(key) for key in
+                 ("vcodec", "pix_fmt", "width", "height", "acodec", "sample_rate", "channels"))
+
+
+def _concat_with_filter(clips: List[Tuple[object, Optional[float], Optional[float]]],
+                        output_path: str, has_audio: bool,
+                        size: Optional[Tuple[int, int]] = None,
+                        threads: Optional[int] = None,
+                        encode_args: Optional[Dict] = None,
+                        duration: float = 0.0,
+                        progress: Optional[RenderProgress] = None) -> None:
+    """Join (input, start, end) clips with a trim/atrim + concat graph in one encode.
+
+    A clip with no start/end is used whole. When size is given every clip is
+    scaled and padded to it and audio is resampled to a common format, so
+    clips from sources with different parameters can be joined.
+    encode_args defaults to FINAL_ENCODE; duration is the length of the
+    output, used for progress reporting.
+    """
+    parts = []
+    for source, start_sec, end_sec in clips:
+        video = source.video
+        audio = source.audio
+        if start_sec is not None:
+            video = video.trim(start=start_sec, end=end_sec)
+            audio = audio.filter('atrim', start=start_sec, end=end_sec)
+        video = video.setpts('PTS-STARTPTS')
+        audio = audio.filter('asetpts', 'PTS-STARTPTS')
+        if size:
+            width, height = size
+            video = (video.filter('scale', width, height, force_original_aspect_ratio='decrease')
+                     .filter('pad', width, height, '(ow-iw)/2', '(oh-ih)/2')
+                     .filter('setsar', 1))
+            audio = audio.filter('aformat', sample_rates=48000, channel_layouts='stereo')
+        parts.append(video)
+        if has_audio:
+            parts.append(audio)
+
+    joined = ffmpeg.concat(*parts, v=1, a=1 if has_audio else 0).node
+    streams = [joined[0], joined[1]] if has_audio else [joined[0]]
+    stream = ffmpeg.output(*streams, output_path,
+                           **(encode_args or FINAL_ENCODE),
+                           **_thread_args(threads))
+    _run(stream, Path(output_path).name, duration, progress)
+
+
+def _preview_size(stream_info: Dict) -> Tuple[int, int]:
+    """Frame size of a preview render, keeping the source's aspect ratio."""
+    width, height = stream_info.get("width"), stream_info.get("height")
+    if not width or not height:
+        return 640, PREVIEW_HEIGHT
+    # libx264 needs even dimensions
+    return round(width * PREVIEW_HEIGHT / height / 2) * 2, PREVIEW_HEIGHT
+
+
+def _join_size(stream_infos: List[Dict]) -> Optional[Tuple[int, int]]:
+    """Frame size to normalize to when joining sources that do not match."""
+    if len({_stream_signature(info) for info in stream_infos}) <= 1:
+        return None
+    first = stream_infos[0]
+    return first["width"], first["height"]
+
+
+def _render_filter_graph(edit_plan: dict, input_path: Union[str, Dict[str, str]], output_path: str,
+                         threads: Optional[int] = None,
+                         media_info: Optional[MediaInfoStore] = None,
+                         preview: bool = False,
+                         progress: Optional[RenderProgress] = None) -> str:
+    """Render the whole plan in one FFmpeg run with a trim/atrim + concat graph.
+
+    Every trim gets its own input seeked with -ss/-t, so only the trimmed
+    ranges are decoded and trims in any order are read as they are needed
+    instead of being buffered from one shared input. The output is encoded
+    once and no intermediate segment files are written. A preview is decoded
+    with PREVIEW_DECODE, scaled down to PREVIEW_HEIGHT in the same graph and
+    encoded with PREVIEW_ENCODE.
+    """
+    trims = ordered_trims(edit_plan)
+    if not trims:
+        raise ValueError("Edit plan has no trim actions to render")
+
+    paths = [source_path(action, input_path) for action in trims]
+    stream_infos = {}
+    for path in paths:
+        if path not in stream_infos:
+            stream_infos[path] = media_info.get(path)
+
+    has_audio = all(info.get("acodec") is not None for info in stream_infos.values())
+    decode_args = PREVIEW_DECODE if preview else {}
+    clips = []
+    duration = 0.0
+    for action, path in zip(trims, paths):
+        start_sec = time_to_seconds(action["start"])
+        end_sec = time_to_seconds(action["end"])
+        source = ffmpeg.input(path, ss=start_sec, t=end_sec - start_sec, **decode_args)
+        clips.append((source, None, None))
+        duration += end_sec - start_sec
+    if preview:
+        size = _preview_size(next(iter(stream_infos.values())))
+        _concat_with_filter(clips, output_path, has_audio, size, threads, PREVIEW_ENCODE,
+                            duration, progress)
+    else:
+        _concat_with_filter(clips, output_path, has_audio,
+                            _join_size(list(stream_infos.values())), threads,
+                            duration=duration, progress=progress)
+    return output_path
+
+
+def _segment_path(temp_dir: Path, action: Dict, mode: str) -> Path:
+    """Where a trim action's segment is written for the given render mode."""
+    segment_path = temp_dir / action["output"]
+    if mode == "smart":
+        # Pieces are joined as MPEG-TS, which carries codec headers in-band
+        segment_path = segment_path.with_suffix(".ts")
+    return segment_path
+
+
+def _render_trim(action: Dict, input_path: str, temp_dir: Path, mode: str,
+                 keyframes: Optional[List[float]], stream_info: Dict,
+                 threads: Optional[int] = None,
+                 cache: Optional[SegmentCache] = None,
+                 progress: Optional[RenderProgress] = None) -> Tuple[Path, str, bool]:
+    """Render one trim action into temp_dir, reusing a cached segment if possible.
+
+    Returns:
+        Tuple[Path, str, bool]: The segment file, how it was rendered and
+        whether it came from the cache
+    """
+    if cache is None:
+        return _encode_trim(action, input_path, temp_dir, mode, keyframes, stream_info,
+                            threads, progress) + (False,)
+
+    start_sec = time_to_seconds(action["start"])
+    end_sec = time_to_seconds(action["end"])
+    key = cache.key(input_path, start_sec, end_sec, {"mode": mode, "version": SEGMENT_VERSION})
+    segment_path = _segment_path(temp_dir, action, mode)
+    method = cache.get(key, segment_path)
+    if method:
+        if progress is not None:
+            progress.skip(segment_path.name, end_sec - start_sec)
+        return segment_path, method, True
+
+    segment_path, method = _encode_trim(action, input_path, temp_dir, mode,
+                                        keyframes, stream_info, threads, progress)
+    cache.put(key, segment_path, method)
+    return segment_path, method, False
+
+
+def _encode_trim(action: Dict, input_path: str, temp_dir: Path, mode: str,
+                 keyframes: Optional[List[float]], stream_info: Dict,
+                 threads: Optional[int] = None,
+                 progress: Optional[RenderProgress] = None) -> Tuple[Path, str]:
+    """Render one trim action into temp_dir.
+
+    Returns:
+        Tuple[Path, str]: The segment file and how it was rendered
+    """
+    start_sec = time_to_seconds(action["start"])
+    end_sec = time_to_seconds(action["end"])
+    segment_path = _segment_path(temp_dir, action, mode)
+    # The file may be hard-linked to a cache entry, which FFmpeg would
+    # overwrite in place; a new file is written instead
+    if segment_path.exists():
+        segment_path.unlink()
+
+    if mode == "copy":
+        if is_on_keyframe(keyframes, start_sec):
+            _copy_segment(input_path, segment_path, start_sec, end_sec, progress)
+            return segment_path, "copy"
+        _reencode_segment(input_path, segment_path, start_sec, end_sec, threads, progress)
+        return segment_path, "reencode"
+
+    if mode == "smart":
+        method = _smart_segment(input_path, segment_path, start_sec, end_sec,
+                                keyframes, stream_info, threads, progress)
+        return segment_path, method
+
+    # Seek the input so the segment keeps its audio as well as its video
+    _reencode_segment(input_path, segment_path, start_sec, end_sec, threads, progress)
+    return segment_path, "reencode"
+
+
+def _render_trims_parallel(jobs: List[Tuple[Dict, str, Optional[List[float]], Dict]],
+                           temp_dir: Path, mode: str, workers: int, threads: Optional[int],
+                           cache: Optional[SegmentCache] = None,
+                           progress: Optional[RenderProgress] = None) -> List[Tuple[Path, str, bool]]:
+    """Render (action, source, keyframes, stream_info) jobs concurrently.
+
+    Results are returned in the order of jobs. Each worker drives its own
+    FFmpeg process, so a thread pool is enough to keep the cores busy. If any
+    segment fails, pending segments are cancelled, running FFmpeg processes
+    are terminated, every segment written so far is deleted and the first error
+    is raised.
+    """
+    executor = ThreadPoolExecutor(max_workers=workers)
+    group = _ProcessGroup()
+    # Each job runs in a copy of the caller's context, so its spans join the
+    # render's trace and its FFmpeg processes join the group
+    token = _process_group.set(group)
+    try:
+        futures = [
+            executor.submit(contextvars.copy_context().run, _render_trim, action, path, temp_dir, mode,
+                            keyframes, stream_info, threads, cache, progress)
+            for action, path, keyframes, stream_info in jobs
+        ]
+    finally:
+        _process_group.reset(token)
+    done, _ = wait(futures, return_when=FIRST_EXCEPTION)
+    failed = next((f for f in done if f.exception() is not None), None)
+    if failed is None:
+        executor.shutdown()
+        return [future.result() for future in futures]
+
+    # Running encodes are terminated instead of waited for
+    group.cancel()
+    executor.shutdown(wait=True, cancel_futures=True)
+    for action, _, _, _ in jobs:
+        for path in (temp_dir / action["output"], _segment_path(temp_dir, action, mode)):
+            if path.exists():
+                path.unlink()
+    raise failed.exception()
+
+
+def generate_ffmpeg_from_plan(edit_plan: dict, input_path: Union[str, Dict[str, str]],
+                              output_path: str = None,
+                              mode: str = "reencode", workers: int = 1,
+                              threads: Optional[int] = None,
+                              cache: Optional[SegmentCache] = None,
+                              media_info: Optional[MediaInfoStore] = None,
+                              preview: bool = False,
+                              progress_callback: Optional[Callable[[ProgressUpdate], None]] = None,
+                              temp_dir: Optional[str] = None):
+    """Render an edit plan with FFmpeg.
+
+    Args:
+        edit_plan (dict): Plan with "trim" and "concat" actions
+        input_path (str | dict): Source video the trims are cut from, or a
+            mapping of video_id to source file for plans whose trims carry a
+            "video_id"; each source is probed once however many trims use it
+        output_path (str, optional): Where to write the final video
+        mode (str): "reencode" re-encodes every segment with libx264/AAC.
+            "copy" stream-copies segments whose start lands on a keyframe and
+            only re-encodes the ones that do not; when every segment was
+            copied the concat step is a stream copy as well.
+            "smart" keeps frame-accurate cuts but only re-encodes the partial
+            GOPs at each segment's edges, stream-copying the rest.
+            "filter" renders everything in a single FFmpeg run with a
+            trim/concat filter graph and writes no temp files.
+        workers (int): Number of trim segments encoded concurrently
+        threads (int, optional): Thread limit passed to each FFmpeg encode
+        cache (SegmentCache, optional): Reuse previously rendered segments of
+            the same source range and mode instead of encoding them again
+        media_info (MediaInfoStore, optional): Where stream parameters and
+            keyframe indexes of the sources are looked up; sources are probed
+            directly when not given
+        preview (bool): Render a low-resolution, ultrafast preview in a single
+            pass instead, whatever the mode; each trim is seeked in its source,
+            so only the trimmed ranges are decoded. Pass proxy files as the
+            sources to make it cheaper still
+        progress_callback (callable, optional): Called with a ProgressUpdate
+            as FFmpeg reports per-segment and overall progress, encode fps,
+            speed and ETA
+        temp_dir (str, optional): Where segments and the concat list are
+            written, "temp" by default; concurrent renders need their own
+
+    Returns:
+        str: Path of the rendered video
+    """
+    if mode not in RENDER_MODES:
+        raise ValueError(f"Unknown render mode {mode!r}, expected one of {RENDER_MODES}")
 
-def generate_ffmpeg_from_plan(edit_plan: dict, input_path: str, output_path: str = None):
     if not output_path:
         output_path = f"output_{uuid.uuid4().hex[:8]}.mp4"
 
+    if media_info is None:
+        media_info = MediaInfoStore()
+
+    # Every segment is encoded once and then joined once, except in a single pass
+    single_pass = mode == "filter" or preview
+    total_seconds = sum(
+        time_to_seconds(action["end"]) - time_to_seconds(action["start"])
+        for action in ordered_trims(edit_plan)
+    ) * (1 if single_pass else 2)
+    progress = RenderProgress(total_seconds, progress_callback) if progress_callback else None
+
+    if single_pass:
+        return _render_filter_graph(edit_plan, input_path, output_path, threads, media_info,
+                                    preview, progress)
+
     # Create temp directory for segments
-    temp_dir = Path("temp")
+    temp_dir = Path(temp_dir or "temp")
     temp_dir.mkdir(parents=True, exist_ok=True)
 
+    trims = [
+        action for action in edit_plan.get("actions", [])
+        if action["type"] == "trim" and action.get("start") and action.get("end") and action.get("output")
+    ]
+    paths = [source_path(action, input_path) for action in trims]
+
+    # Look up every source once, however many segments it contributes
+    keyframes: Dict[str, Optional[List[float]]] = {}
+    stream_infos: Dict[str, Dict] = {}
+    for path in dict.fromkeys(paths):
+        if mode in ("copy", "smart") or len(set(paths)) > 1:
+            stream_infos[path] = media_info.get(path)
+        if mode in ("copy", "smart"):
+            keyframes[path] = keyframe_times(stream_infos[path])
+
     # Process trim actions first
+    jobs = [
+        (action, path, keyframes.get(path), stream_infos.get(path, {}))
+        for action, path in zip(trims, paths)
+    ]
+    if workers > 1 and len(jobs) > 1:
+        results = _render_trims_parallel(jobs, temp_dir, mode, workers, threads, cache, progress)
+    else:
+        results = [
+            _render_trim(action, path, temp_dir, mode, path_keyframes, stream_info,
+                         threads, cache, progress)
+            for action, path, path_keyframes, stream_info in jobs
+        ]
+
     segment_files = []
-    for action in edit_plan.get("actions", []):
-        if action["type"] == "trim":
-            start = action.get("start")
-            end = action.get("end")
-            output = action.get("output")
-            
-            if start and end and output:
-                # Convert timestamps to seconds
-                def time_to_seconds(time_str):
-                    h, m, s = map(float, time_str.split(':'))
-                    return h * 3600 + m * 60 + s
-
-                start_sec = time_to_seconds(start)
-                end_sec = time_to_seconds(end)
-                
-                # Create output path for this segment
-                segment_path = temp_dir / output
-                
-                # Trim the segment with both video and audio
-                stream = ffmpeg.input(input_path)
-                stream = ffmpeg.trim(stream, start=start_sec, end=end_sec).setpts('PTS-STARTPTS')
-                # Use appropriate codecs for filtered output
-                stream = ffmpeg.output(stream, str(segment_path), 
-                                     acodec='aac',  # Use AAC for audio
-                                     vcodec='libx264',  # Use H.264 for video
-                                     audio_bitrate='192k')  # Set reasonable audio bitrate
-                ffmpeg.run(stream, overwrite_output=True)
-                
-                segment_files.append(str(segment_path))
+    rendered: Dict[str, Path] = {}  # trim output name -> rendered segment file
+    segment_report: List[Dict] = []
+    for action, (segment_path, method, cached) in zip(trims, results):
+        segment_files.append(str(segment_path))
+        rendered[action["output"]] = segment_path
+        segment_report.append({
+            "file": action["output"],
+            "video_id": action.get("video_id"),
+            "start": action["start"],
+            "end": action["end"],
+            "method": method,
+            "cached": cached,
+        })
+
+    if mode in ("copy", "smart") or cache is not None:
+        print("\nSegment render paths:")
+        for entry in segment_report:
+            cached = " (cached)" if entry["cached"] else ""
+            print(f"  {entry['file']} ({entry['start']} - {entry['end']}): {entry['method']}{cached}")
+
+    # Sources with different codec parameters have to be normalized while joining
+    join_size = _join_size(list(stream_infos.values())) if stream_infos else None
+
+    # Segments that were all stream-copied share the source codecs and can be
+    # joined without another encode; smart segments are encoded to match them
+    copy_concat = join_size is None and (mode == "smart" or (bool(segment_report) and all(
+        entry["method"] == "copy" for entry in segment_report
+    )))
 
     # Process concat action
     for action in edit_plan.get("actions", []):
@@ -50,25 +679,43 @@ def generate_ffmpeg_from_plan(edit_plan: dict, input_path: str, output_path: str
             if segments:
                 # Sort segments by position
                 segments.sort(key=lambda x: x["position"])
-                
+
+                # Differing sources, or copied segments mixed with re-encoded
+                # ones (different codecs and SPS/PPS), can't go through the
+                # concat demuxer, so each file is decoded by the concat filter
+                if join_size is not None or (mode == "copy" and not copy_concat):
+                    files = [rendered.get(segment["file"], temp_dir / segment["file"]) for segment in segments]
+                    clips = [(ffmpeg.input(str(f)), None, None) for f in files if f.exists()]
+                    has_audio = all(info.get("acodec") is not None for info in stream_infos.values())
+                    _concat_with_filter(clips, output_path, has_audio, join_size, threads,
+                                        duration=total_seconds / 2, progress=progress)
+                    continue
+
                 # Create concat file
                 concat_file = temp_dir / "concat_list.txt"
                 with open(concat_file, "w") as f:
                     for segment in segments:
-                        file_path = temp_dir / segment["file"]
+                        file_path = rendered.get(segment["file"], temp_dir / segment["file"])
                         if file_path.exists():
                             # Use absolute path in concat file
                             f.write(f"file '{file_path.absolute()}'\n")
-                
+
                 # Use concat demuxer to join segments with audio
                 stream = ffmpeg.input(str(concat_file), format='concat', safe=0)
-                # Use appropriate codecs for final output
-                stream = ffmpeg.output(stream, output_path, 
-                                     acodec='aac',  # Use AAC for audio
-                                     vcodec='libx264',  # Use H.264 for video
-                                     audio_bitrate='192k')  # Set reasonable audio bitrate
-                ffmpeg.run(stream, overwrite_output=True)
-                
+                if copy_concat and mode == "smart":
+                    # ADTS AAC from MPEG-TS segments needs converting for MP4
+                    stream = ffmpeg.output(stream, output_path, c='copy',
+                                           **{'bsf:a': 'aac_adtstoasc'})
+                elif copy_concat:
+                    stream = ffmpeg.output(stream, output_path, c='copy')
+                else:
+                    # Use appropriate codecs for final output
+                    stream = ffmpeg.output(stream, output_path,
+                                         acodec='aac',  # Use AAC for audio
+                                         vcodec='libx264',  # Use H.264 for video
+                                         audio_bitrate='192k')  # Set reasonable audio bitrate
+                _run(stream, Path(output_path).name, total_seconds / 2, progress)
+
                 # Clean up concat file
                 concat_file.unlink()
 
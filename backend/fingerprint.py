@@ -0,0 +1,37 @@
+import hashlib
+import os
+
+# Bytes read from each sampled region of a file
+CHUNK_SIZE = 1024 * 1024
+
+
+def sampled_fingerprint(path: str, chunk_size: int = CHUNK_SIZE) -> str:
+    """Fingerprint a file from its size and its head, middle and tail chunks.
+
+    This reads at most three chunks, so it is fast on multi-GB camera files,
+    and it does not depend on the file's name or location.
+    """
+    size = os.path.getsize(path)
+    digest = hashlib.sha256(str(size).encode())
+    with open(path, "rb") as f:
+        if size <= 3 * chunk_size:
+            digest.update(f.read())
+        else:
+            for offset in (0, size // 2 - chunk_size // 2, size - chunk_size):
+                f.seek(offset)
+                digest.update(f.read(chunk_size))
+    return f"sampled:{digest.hexdigest()}"
+
+
+def full_fingerprint(path: str, chunk_size: int = CHUNK_SIZE) -> str:
+    """Fingerprint a file from a SHA-256 of its entire contents."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return f"sha256:{digest.hexdigest()}"
+
+
+def fingerprint(path: str, full: bool = False) -> str:
+    """Fingerprint a file, hashing all of it only when full is set."""
+    return full_fingerprint(path) if full else sampled_fingerprint(path)
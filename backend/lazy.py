@@ -0,0 +1,30 @@
+import threading
+from typing import Any, Callable
+
+
+class LazyClient:
+    """Stands in for a client that is only built, by factory, when first used.
+
+    Attribute access and indexing are forwarded to the built client, so
+    module-level clients cost nothing until a command actually needs them
+    and SDK imports can be deferred into the factory.
+    """
+
+    def __init__(self, factory: Callable[[], Any]):
+        self._factory = factory
+        self._instance = None
+        self._lock = threading.Lock()
+
+    def get(self) -> Any:
+        """Return the client, building it on the first call."""
+        if self._instance is None:
+            with self._lock:
+                if self._instance is None:
+                    self._instance = self._factory()
+        return self._instance
+
+    def __getattr__(self, name: str):
+        return getattr(self.get(), name)
+
+    def __getitem__(self, key):
+        return self.get()[key]
@@ -4,28 +4,55 @@ import argparse
 from datetime import datetime
 from typing import List, Dict, Tuple, Optional
 import subprocess
-from pymongo import MongoClient
 from pathlib import Path
 import shutil
 import sys
 import asyncio
+import contextlib
+import uuid
 from dataclasses import dataclass
 from enum import Enum
 
-from twelve import upload_video, client, INDEX_ID, search_video
-from process_results import ClipProcessor
-from prompt import generate_prompt
+from twelve import create_upload_task, get_task, client, INDEX_ID, search_video, search_cache, reset_offline
+from search_cache import normalize_query
+from process_results import ClipProcessor, merge_clips
+from prompt import generate_prompt, gemini_client
 from edit_generator import generate_ffmpeg_from_plan
-from google import genai
+from render_cache import SegmentCache
+from media_info import MediaInfoStore, probe_stream_info
+from metadata_cache import MetadataCache, ensure_indexes
+from proxy import UPLOAD_HEIGHT, find_proxy, make_proxy, preview_sources, proxy_path_for
+from progress import print_progress
+from fingerprint import fingerprint
+from offline import OFFLINE, OfflineMongoClient
+from tracing import tracer
+from lazy import LazyClient
+from batch import run_batch_cli
 from dotenv import load_dotenv
 
 # Load environment variables
 load_dotenv()
-GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
-gemini_client = genai.Client(api_key=GEMINI_API_KEY)
-db_client = MongoClient(os.getenv("MONGO_URI"))
-db = db_client["videos"]  # Changed database name to "videos"
-print(f"Connected to MongoDB database: {db.name}")  # Debug log
+if OFFLINE:
+    # Local stand-ins for benchmarks and tests; nothing leaves the machine
+    print("Running offline: Twelvelabs, Gemini and MongoDB are simulated")
+
+
+def _make_db_client():
+    if OFFLINE:
+        return OfflineMongoClient()
+    from pymongo import MongoClient
+    return MongoClient(os.getenv("MONGO_URI"))
+
+
+# pymongo is imported and the client built on the first database access
+db_client = LazyClient(_make_db_client)
+DB_NAME = "videos"  # Changed database name to "videos"
+
+
+def reset_offline_services() -> None:
+    """Empty the offline Twelvelabs index and database, e.g. between benchmark runs."""
+    reset_offline()
+    db_client.reset()
 
 
 class VideoStatus(Enum):
@@ -42,112 +69,352 @@ class VideoMetadata:
     task_id: Optional[str]
     status: VideoStatus
     error: Optional[str] = None
+    video_id: Optional[str] = None
+    indexing_status: Optional[str] = None  # Raw status of the Twelvelabs task
 
 
 class VideoEditor:
-    def __init__(self):
+    def __init__(self, render_mode: Optional[str] = None, render_workers: Optional[int] = None,
+                 ffmpeg_threads: Optional[int] = None):
         self.processor = ClipProcessor()
+        # "reencode" (default), "copy", "smart" or "filter"; see generate_ffmpeg_from_plan
+        self.render_mode = render_mode or os.getenv("RENDER_MODE", "reencode")
+        # Segments encoded concurrently and the thread limit for each FFmpeg process
+        self.render_workers = render_workers or int(os.getenv("RENDER_WORKERS", "1"))
+        self.ffmpeg_threads = ffmpeg_threads or (int(os.getenv("FFMPEG_THREADS", "0")) or None)
+        # Rendered segments are reused across edits; SEGMENT_CACHE_MB=0 disables the cache
+        cache_mb = int(os.getenv("SEGMENT_CACHE_MB", "5120"))
+        self.segment_cache = SegmentCache(max_bytes=cache_mb * 1024 ** 2) if cache_mb > 0 else None
         self.output_dir = Path("edited/videos")
         self.temp_dir = Path("temp")
         self.clips_dir = self.temp_dir / "clips"
         self.video_metadata: Dict[str, VideoMetadata] = {}
-        self.video_id_to_path: Dict[str, str] = {}  # Map video_id to original file path
-        self.metadata_collection = db["metadata"]  # MongoDB collection for video metadata
-        print(f"Using collection: {self.metadata_collection.name}")  # Debug log
+        # MongoDB collection for video metadata, opened on first use
+        self.metadata_collection = LazyClient(self._open_metadata_collection)
+        # Stream parameters and keyframe index of each source, stored with its metadata
+        self.media_info = MediaInfoStore(self.metadata_collection)
+        # video_id -> metadata lookups served from memory, bulk-loaded on first use
+        self.metadata_cache = MetadataCache(
+            self.metadata_collection, LazyClient(lambda: db_client[DB_NAME]["state"]),
+            max_entries=int(os.getenv("METADATA_CACHE_SIZE", "10000")),
+        )
+        # Pre-generate low-resolution proxies of registered videos for previews
+        self.preview_proxies = os.getenv("PREVIEW_PROXIES", "0") == "1"
+        # Search clips of the same video closer than this (seconds) are merged
+        self.clip_merge_gap = float(os.getenv("CLIP_MERGE_GAP", "1.0"))
+        # Uploads in flight at once, and how often indexing status is polled
+        self.max_concurrent_uploads = int(os.getenv("MAX_CONCURRENT_UPLOADS", "4"))
+        self.index_poll_interval = float(os.getenv("INDEX_POLL_INTERVAL", "5"))
+        # Search queries sent to Twelvelabs at once
+        self.max_concurrent_searches = int(os.getenv("MAX_CONCURRENT_SEARCHES", "8"))
+        # Hash whole files instead of sampled chunks when fingerprinting uploads
+        self.full_hash = os.getenv("FULL_HASH", "0") == "1"
+        # Upload 720p proxies instead of the masters, transcoding this many at once
+        self.upload_proxies = os.getenv("UPLOAD_PROXIES", "0") == "1"
+        self.max_concurrent_transcodes = int(os.getenv("MAX_CONCURRENT_TRANSCODES", "2"))
+        # H.264/HEVC masters up to 720p below this bitrate are uploaded without a proxy
+        self.upload_proxy_max_kbps = int(os.getenv("UPLOAD_PROXY_MAX_KBPS", "4000"))
 
         # Create necessary directories
         self.output_dir.mkdir(parents=True, exist_ok=True)
         self.temp_dir.mkdir(parents=True, exist_ok=True)
         self.clips_dir.mkdir(parents=True, exist_ok=True)
 
+    def _open_metadata_collection(self):
+        """Connect to the metadata collection and make sure it is indexed."""
+        db = db_client[DB_NAME]
+        print(f"Connected to MongoDB database: {db.name}")  # Debug log
+        collection = db["metadata"]
+        print(f"Using collection: {collection.name}")  # Debug log
+        ensure_indexes(collection)
+        return collection
+
     def list_uploaded_videos(self) -> List[Dict]:
         """List all videos that have been uploaded."""
         return list(self.metadata_collection.find({}, {"_id": 0}))
 
-    def check_video_exists(self, video_id: str) -> bool:
-        """Check if a video exists in our database."""
-        return self.metadata_collection.find_one({"video_id": video_id}) is not None
+    def metadata_document(self, video_id: str, original_path: str,
+                          content_fingerprint: Optional[str] = None) -> Dict:
+        """Build the metadata document of a video, fingerprinting and probing its file."""
+        metadata = {
+            "video_id": video_id,
+            "original_path": original_path,
+            "uploaded_at": datetime.utcnow()
+        }
+        try:
+            metadata["fingerprint"] = content_fingerprint or fingerprint(original_path, self.full_hash)
+        except OSError as e:
+            print(f"Warning: Could not fingerprint {original_path}: {str(e)}")
+        try:
+            metadata["media_info"] = self.media_info.probe(original_path)
+        except Exception as e:
+            # Rendering probes again on demand, so this is not fatal
+            print(f"Warning: Could not probe {original_path}: {str(e)}")
+        return metadata
 
-    def save_video_metadata(self, video_id: str, original_path: str) -> None:
+    def save_video_metadata(self, video_id: str, original_path: str,
+                            content_fingerprint: Optional[str] = None) -> None:
         """Save video metadata to MongoDB."""
+        self.save_videos_metadata([self.metadata_document(video_id, original_path, content_fingerprint)])
+
+    def save_videos_metadata(self, documents: List[Dict]) -> None:
+        """Upsert metadata documents in a single bulk_write round trip.
+
+        The write acknowledgement confirms the save, so nothing is read back.
+        """
+        if not documents:
+            return
+        from pymongo import UpdateOne
+
         try:
-            metadata = {
-                "video_id": video_id,
-                "original_path": original_path,
-                "uploaded_at": datetime.utcnow()
-            }
             print(f"\nSaving metadata to MongoDB:")  # Debug log
-            print(f"Video ID: {video_id}")
-            print(f"Original Path: {original_path}")
-            
-            result = self.metadata_collection.update_one(
-                {"video_id": video_id},
-                {"$set": metadata},
-                upsert=True
-            )
-            
-            if result.upserted_id:
-                print(f"New document created with ID: {result.upserted_id}")
-            elif result.modified_count > 0:
-                print(f"Existing document updated")
-            else:
-                print(f"No changes made to document")
-                
-            # Verify the save
-            saved_doc = self.metadata_collection.find_one({"video_id": video_id})
-            if saved_doc:
-                print("Successfully verified metadata in database")
+            for metadata in documents:
+                print(f"Video ID: {metadata['video_id']} -> Original Path: {metadata['original_path']}")
+
+            with tracer.span("save_video_metadata", videos=len(documents)):
+                result = self.metadata_collection.bulk_write([
+                    UpdateOne({"video_id": metadata["video_id"]}, {"$set": metadata}, upsert=True)
+                    for metadata in documents
+                ], ordered=False)
+
+            self.metadata_cache.update(documents)
+
+            if not result.acknowledged:
+                print("Warning: Metadata write was not acknowledged")
             else:
-                print("Warning: Could not verify metadata in database")
-                
+                print(f"{result.upserted_count} new and {result.modified_count} updated documents")
+
         except Exception as e:
             print(f"Error saving metadata to MongoDB: {str(e)}")
             raise
 
-    def get_video_metadata(self, video_id: str) -> Optional[Dict]:
-        """Retrieve video metadata from MongoDB."""
+    def find_by_fingerprint(self, content_fingerprint: str) -> Optional[Dict]:
+        """Find an indexed video with the same content, wherever it was uploaded from."""
+        return self.metadata_cache.find_by_fingerprint(content_fingerprint)
+
+    def relink_video(self, video_id: str, original_path: str) -> None:
+        """Point an indexed video at the file's new location after a rename or move."""
+        update = {"original_path": original_path}
         try:
-            metadata = self.metadata_collection.find_one({"video_id": video_id})
-            if metadata:
-                print(f"Found metadata for video ID {video_id}")  # Debug log
-            else:
-                print(f"No metadata found for video ID {video_id}")  # Debug log
+            update["media_info"] = self.media_info.probe(original_path)
+        except Exception as e:
+            print(f"Warning: Could not probe {original_path}: {str(e)}")
+        self.metadata_collection.update_one({"video_id": video_id}, {"$set": update})
+        self.metadata_cache.update([{"video_id": video_id, **update}])
+        print(f"Re-linked video ID {video_id} -> {original_path}")
+
+    def ensure_preview_proxy(self, original_path: str) -> None:
+        """Generate the preview proxy of a video if enabled and missing."""
+        if not self.preview_proxies or find_proxy(original_path):
+            return
+        try:
+            print(f"Generating preview proxy for {original_path}")
+            make_proxy(original_path, threads=self.ffmpeg_threads)
+        except Exception as e:
+            # Previews fall back to the original file
+            print(f"Warning: Could not generate preview proxy: {str(e)}")
+
+    def get_videos_metadata(self, video_ids: List[str]) -> Dict[str, Dict]:
+        """Retrieve metadata for several videos, querying MongoDB at most once for cache misses."""
+        try:
+            with tracer.span("get_videos_metadata", video_ids=len(video_ids)) as span:
+                metadata = self.metadata_cache.get_many(video_ids)
+                span.set(found=len(metadata))
+            print(f"Found metadata for {len(metadata)} of {len(video_ids)} video IDs")  # Debug log
             return metadata
         except Exception as e:
             print(f"Error retrieving metadata from MongoDB: {str(e)}")
-            return None
+            return {}
+
+    def resolve_video_paths(self, video_ids: List[str]) -> Dict[str, str]:
+        """Map video IDs to original file paths through the metadata cache.
 
-    async def upload_video_async(self, path: str) -> None:
-        """Asynchronously upload and index a video."""
+        The cache reloads when another process changes the metadata, so a
+        video re-linked elsewhere resolves to its new path.
+        """
+        return {
+            video_id: metadata['original_path']
+            for video_id, metadata in self.get_videos_metadata(list(dict.fromkeys(video_ids))).items()
+        }
+
+    def make_upload_proxy(self, path: str) -> str:
+        """Transcode a master to the small H.264 file that is uploaded for indexing.
+
+        Only H.264/HEVC masters no taller than UPLOAD_HEIGHT and below
+        UPLOAD_PROXY_MAX_KBPS are returned as they are, since a proxy of them
+        would be no smaller. Everything else, such as ProRes or DNx masters of
+        any size, is transcoded; the proxy never upscales.
+        """
         try:
-            print(f"\nUploading video: {path}")
-            self.video_metadata[path] = VideoMetadata(path=path, task_id=None, status=VideoStatus.UPLOADING)
-            task_id = await upload_video(path)
-            self.video_metadata[path].task_id = task_id
-            self.video_metadata[path].status = VideoStatus.INDEXING
+            info = probe_stream_info(path)
+        except Exception as e:
+            print(f"Warning: Could not probe {path}: {str(e)}")
+            info = {}
+        height, bit_rate = info.get("height"), info.get("bit_rate")
+        if (info.get("vcodec") in ("h264", "hevc") and height and height <= UPLOAD_HEIGHT
+                and bit_rate and bit_rate <= self.upload_proxy_max_kbps * 1000):
+            print(f"Uploading {path} as is: {info['vcodec']} {height}p at "
+                  f"{bit_rate // 1000} kb/s is already proxy-sized")
+            return path
+        proxy_path = str(proxy_path_for(path, height=UPLOAD_HEIGHT))
+        print(f"Transcoding {path} to upload proxy {proxy_path}")
+        return make_proxy(path, proxy_path, height=UPLOAD_HEIGHT, crf=28, preset="veryfast",
+                          threads=self.ffmpeg_threads)
+
+    async def upload_video_async(self, path: str, semaphore: Optional[asyncio.Semaphore] = None,
+                                 transcode_semaphore: Optional[asyncio.Semaphore] = None,
+                                 content_fingerprint: Optional[str] = None) -> None:
+        """Asynchronously upload and index a video.
+
+        The blocking SDK calls run in worker threads. Only the upload itself
+        holds the semaphore; indexing is polled without occupying a slot.
+        With upload proxies enabled the master is first transcoded under
+        transcode_semaphore, so one file's transcode overlaps another's upload.
+        The video's metadata is saved as soon as it is indexed, so an
+        interrupted batch never uploads it again and a failed save is
+        reported as this video's error.
+        content_fingerprint skips fingerprinting when the caller already did.
+        """
+        metadata = VideoMetadata(path=path, task_id=None, status=VideoStatus.PENDING)
+        self.video_metadata[path] = metadata
+        try:
+            # Skip files whose content is already indexed, even under another name
+            if content_fingerprint is None:
+                content_fingerprint = await asyncio.to_thread(fingerprint, path, self.full_hash)
+            existing = await asyncio.to_thread(self.find_by_fingerprint, content_fingerprint)
+            if existing:
+                print(f"\nSkipping upload of {path}: already indexed as {existing['video_id']}")
+                if existing.get("original_path") != path:
+                    await asyncio.to_thread(self.relink_video, existing["video_id"], path)
+                metadata.video_id = existing["video_id"]
+                metadata.status = VideoStatus.READY
+                return
+
+            upload_path = path
+            if self.upload_proxies:
+                async with transcode_semaphore or contextlib.nullcontext():
+                    upload_path = await asyncio.to_thread(self.make_upload_proxy, path)
+
+            async with semaphore or contextlib.nullcontext():
+                print(f"\nUploading video: {upload_path}")
+                metadata.status = VideoStatus.UPLOADING
+                try:
+                    task = await asyncio.to_thread(create_upload_task, upload_path)
+                finally:
+                    # Indexing works from the uploaded copy; renders use the master
+                    if upload_path != path and os.path.exists(upload_path):
+                        os.remove(upload_path)
+                metadata.task_id = task.id
+            metadata.status = VideoStatus.INDEXING
             
             # Wait for indexing to complete
             while True:
-                status = await client.task.get(task_id)
-                if status.status == "completed":
-                    self.video_metadata[path].status = VideoStatus.READY
-                    # Store the mapping of video_id to original path
-                    self.video_id_to_path[status.video_id] = path
+                task = await asyncio.to_thread(get_task, metadata.task_id)
+                if task.status != metadata.indexing_status:
+                    print(f"  {os.path.basename(path)}: Status={task.status}")
+                metadata.indexing_status = task.status
+                if task.status == "ready":
+                    metadata.video_id = task.video_id
                     # Save metadata to MongoDB
                     print(f"\nVideo indexing completed. Saving metadata...")  # Debug log
-                    self.save_video_metadata(status.video_id, path)
-                    print(f"Video uploaded successfully. ID: {status.video_id} -> Path: {path}")
+                    await asyncio.to_thread(self.save_video_metadata, task.video_id, path,
+                                            content_fingerprint)
+                    await asyncio.to_thread(self.ensure_preview_proxy, path)
+                    metadata.status = VideoStatus.READY
+                    # Earlier searches could not have matched this video
+                    if search_cache is not None:
+                        search_cache.invalidate(INDEX_ID)
+                    print(f"Video uploaded successfully. ID: {task.video_id} -> Path: {path}")
                     break
-                elif status.status == "failed":
-                    self.video_metadata[path].status = VideoStatus.ERROR
-                    self.video_metadata[path].error = status.error
+                elif task.status == "failed":
+                    metadata.status = VideoStatus.ERROR
+                    metadata.error = f"Indexing failed for task {metadata.task_id}"
                     break
-                await asyncio.sleep(5)
+                await asyncio.sleep(self.index_poll_interval)
         except Exception as e:
-            self.video_metadata[path].status = VideoStatus.ERROR
-            self.video_metadata[path].error = str(e)
+            metadata.status = VideoStatus.ERROR
+            metadata.error = str(e)
             print(f"Error during upload: {str(e)}")  # Debug log
 
+    async def ingest_videos(self, video_paths: List[str]) -> None:
+        """Upload and index videos concurrently, at most max_concurrent_uploads at a time.
+
+        Files are fingerprinted before any upload starts, so files with the
+        same content are uploaded once; the others share its video ID.
+        """
+        semaphore = asyncio.Semaphore(self.max_concurrent_uploads)
+        transcode_semaphore = asyncio.Semaphore(self.max_concurrent_transcodes)
+
+        async def upload(path: str, content_fingerprint: Optional[str]) -> None:
+            size = os.path.getsize(path) if os.path.exists(path) else None
+            with tracer.span("upload", path=path, bytes=size) as span:
+                await self.upload_video_async(path, semaphore, transcode_semaphore, content_fingerprint)
+                metadata = self.video_metadata[path]
+                span.set(status=metadata.status.value, video_id=metadata.video_id)
+
+        with tracer.span("ingest", videos=len(video_paths)):
+            paths = list(dict.fromkeys(video_paths))
+            # Files that cannot be fingerprinted here fail, and are reported, in upload_video_async
+            fingerprints = await asyncio.gather(
+                *(asyncio.to_thread(fingerprint, path, self.full_hash) for path in paths),
+                return_exceptions=True,
+            )
+            uploads: Dict[str, Optional[str]] = {}  # path -> fingerprint, for files uploaded
+            first_with_content: Dict[str, str] = {}  # fingerprint -> path uploaded for it
+            duplicates: Dict[str, str] = {}  # path -> path with the same content
+            for path, content_fingerprint in zip(paths, fingerprints):
+                if isinstance(content_fingerprint, Exception):
+                    uploads[path] = None
+                elif content_fingerprint in first_with_content:
+                    duplicates[path] = first_with_content[content_fingerprint]
+                else:
+                    first_with_content[content_fingerprint] = path
+                    uploads[path] = content_fingerprint
+
+            await asyncio.gather(*(upload(path, content_fingerprint)
+                                   for path, content_fingerprint in uploads.items()))
+
+        for path, original in duplicates.items():
+            print(f"\nSkipped upload of {path}: same content as {original}")
+            source = self.video_metadata[original]
+            self.video_metadata[path] = VideoMetadata(
+                path=path, task_id=source.task_id, status=source.status, error=source.error,
+                video_id=source.video_id, indexing_status=source.indexing_status,
+            )
+
+        ready = sum(1 for path in video_paths if self.video_metadata[path].status == VideoStatus.READY)
+        print(f"\n{ready} of {len(video_paths)} videos indexed")
+
+    async def search_clips(self, queries: List[str]) -> List[Dict]:
+        """Run all search queries concurrently and return their combined clips.
+
+        Searches share the module-level Twelvelabs client and its connection
+        pool; at most max_concurrent_searches are in flight. A failed query
+        is reported and skipped.
+        """
+        # Queries differing only in case or spacing hit the same results
+        unique_queries = list({normalize_query(query): query for query in queries}.values())
+        semaphore = asyncio.Semaphore(self.max_concurrent_searches)
+
+        async def run(query: str) -> List[Dict]:
+            async with semaphore:
+                with tracer.span("search_query", query=query) as span:
+                    # Run search_video in a thread pool since it's synchronous
+                    clips = await asyncio.to_thread(search_video, query)
+                    span.set(clips=len(clips))
+                return clips
+
+        with tracer.span("search", queries=len(unique_queries)):
+            results = await asyncio.gather(*(run(query) for query in unique_queries),
+                                           return_exceptions=True)
+        clips = []
+        for query, result in zip(unique_queries, results):
+            if isinstance(result, Exception):
+                print(f"Error searching for '{query}': {str(result)}")
+                continue
+            clips.extend(result)
+        return clips
+
     def analyze_prompt(self, prompt: str) -> Dict:
         """First Gemini call to analyze prompt and extract structured information."""
         analysis_prompt = f"""
@@ -159,10 +426,12 @@ class VideoEditor:
         Output: A JSON object with 'search_queries': ["query1", "query2"], 'editing_actions': ["action1", "action2"], 'target_videos': ["video1.mp4" or "all_indexed_videos"]
         """
 
-        response = gemini_client.models.generate_content(
-            model="gemini-2.0-flash",
-            contents=[analysis_prompt],
-        )
+        with tracer.span("analyze_prompt", prompt_chars=len(prompt)) as span:
+            response = gemini_client.models.generate_content(
+                model="gemini-2.0-flash",
+                contents=[analysis_prompt],
+            )
+            span.set(response_chars=len(response.text or ""))
         try:
             return json.loads(response.text)
         except:
@@ -174,51 +443,94 @@ class VideoEditor:
             }
 
     async def process_edit(
-        self, prompt: str, video_paths: List[str], skip_upload: bool = False
-    ):
-        """Main function to process the video edit request."""
+        self, prompt: str, video_paths: List[str], skip_upload: bool = False,
+        approve: Optional[str] = None, output_path: Optional[str] = None,
+        render_mode: Optional[str] = None
+    ) -> Dict:
+        """Main function to process the video edit request.
+
+        Without approve the user is asked whether and how to render. Batch
+        runs pass approve="final", "preview" or "both" to render without
+        asking, optionally to output_path and in a render_mode of their own.
+
+        Every stage is traced; the time spent per stage is printed at the end.
+
+        Returns:
+            Dict: "status" ("done", "no_clips", "missing_videos", "plan_error",
+            "cancelled" or "render_error"), the number of "clips" and plan
+            "trims", the "output" and "preview" paths rendered, an "error"
+            message and seconds spent per stage in "timings"
+        """
+        trace_id = None
+        result: Dict = {"status": "error"}
+        try:
+            with tracer.span("process_edit", videos=len(video_paths), skip_upload=skip_upload) as span:
+                trace_id = span.trace_id
+                result = await self._process_edit(prompt, video_paths, skip_upload, approve,
+                                                  output_path, render_mode)
+                span.set(status=result["status"])
+            return result
+        finally:
+            if trace_id is not None:
+                totals = tracer.totals(trace_id)
+                result["timings"] = {name: round(entry["total"], 3) for name, entry in totals.items()}
+                print(f"\n{tracer.summary(trace_id, totals)}")
+                if tracer.path:
+                    print(f"Trace written to {tracer.path}")
+
+    async def _process_edit(
+        self, prompt: str, video_paths: List[str], skip_upload: bool = False,
+        approve: Optional[str] = None, output_path: Optional[str] = None,
+        render_mode: Optional[str] = None
+    ) -> Dict:
+        # Blocking steps run in worker threads, so concurrent batch jobs overlap
         if not skip_upload:
             # 1. Upload videos asynchronously
             print("Uploading videos...")
-            upload_tasks = [self.upload_video_async(path) for path in video_paths]
-            await asyncio.gather(*upload_tasks)
+            await self.ingest_videos(video_paths)
             
             # Check for any upload errors
-            for path, metadata in self.video_metadata.items():
+            for path in video_paths:
+                metadata = self.video_metadata[path]
                 if metadata.status == VideoStatus.ERROR:
                     print(f"Error uploading {path}: {metadata.error}")
 
         # 2. Analyze prompt
         print("\nAnalyzing prompt...")
-        analysis = self.analyze_prompt(prompt)
+        analysis = await asyncio.to_thread(self.analyze_prompt, prompt)
         print(f"Search queries: {analysis['search_queries']}")
         print(f"Editing actions: {analysis['editing_actions']}")
         print(f"Target videos: {analysis['target_videos']}")
 
         # 3. Search for clips using Twelvelabs
         print("\nSearching for relevant clips...")
-        clips = []
-        for query in analysis["search_queries"]:
-            # Run search_video in a thread pool since it's synchronous
-            search_results = await asyncio.to_thread(search_video, query)
-            clips.extend(search_results)
+        clips = await self.search_clips(analysis["search_queries"])
+        print(f"\nTwelvelabs API usage:\n{client.stats.summary()}")
 
         if not clips:
             print("No relevant clips found.")
-            return
+            return {"status": "no_clips"}
 
-        # Check if all clips are from videos we have in our database
-        missing_videos = []
-        for clip in clips:
-            if not self.check_video_exists(clip['video_id']):
-                missing_videos.append(clip['video_id'])
+        # Drop duplicate and overlapping hits before planning and rendering
+        found = len(clips)
+        clips = merge_clips(clips, self.clip_merge_gap)
+        if len(clips) < found:
+            print(f"Merged {found} search hits into {len(clips)} clips")
+
+        # Check if all clips are from videos we have in our database; the
+        # metadata cache resolves every distinct video at once, querying
+        # MongoDB at most once for any it does not hold
+        clip_video_ids = list(dict.fromkeys(clip['video_id'] for clip in clips))
+        known_paths = await asyncio.to_thread(self.resolve_video_paths, clip_video_ids)
+        missing_videos = [video_id for video_id in clip_video_ids if video_id not in known_paths]
 
         if missing_videos:
             print("\nWarning: Some videos referenced in the search results have not been uploaded:")
             for video_id in missing_videos:
                 print(f"- Video ID: {video_id}")
             print("\nPlease upload these videos first using option 1.")
-            return
+            return {"status": "missing_videos", "clips": len(clips),
+                    "error": f"Videos not uploaded: {', '.join(missing_videos)}"}
 
         print("\nFound clips:")
         for i, clip in enumerate(clips):
@@ -231,68 +543,141 @@ class VideoEditor:
         # 4. Generate edit plan using the prompt generator
         print("\nGenerating edit plan...")
         try:
-            edit_plan_json = generate_prompt(prompt, clips)
-            edit_plan = json.loads(edit_plan_json)
+            with tracer.span("generate_prompt", clips=len(clips)) as span:
+                edit_plan_json = await asyncio.to_thread(generate_prompt, prompt, clips)
+                edit_plan = json.loads(edit_plan_json)
+                span.set(response_chars=len(edit_plan_json), actions=len(edit_plan.get("actions", [])))
             print("\nGenerated edit plan:")
             print(json.dumps(edit_plan, indent=2))
         except Exception as e:
             print(f"Error generating edit plan: {str(e)}")
-            return
+            return {"status": "plan_error", "clips": len(clips), "error": str(e)}
 
         # 5. Ask user if they want to proceed with the edit
-        print("\nWould you like to proceed with the edit?")
-        print("1. Yes, generate and execute FFmpeg command")
-        print("2. No, exit")
-        
-        choice = input("\nSelect an option (1-2): ").strip()
-        
-        if choice == "1":
-            try:
-                # Get the video path from the first clip
-                if not clips:
-                    print("No clips found to edit.")
-                    return
-                
-                # Try to get the original file path from our mapping or MongoDB
-                video_id = clips[0]['video_id']
-                print(f"\nLooking up original file for video ID: {video_id}")
-                
-                # First try in-memory mapping
-                if video_id in self.video_id_to_path:
-                    input_path = self.video_id_to_path[video_id]
-                else:
-                    # If not in memory, try MongoDB
-                    metadata = self.get_video_metadata(video_id)
-                    if metadata:
-                        input_path = metadata['original_path']
-                        # Update in-memory mapping
-                        self.video_id_to_path[video_id] = input_path
-                    else:
-                        print(f"\nOriginal file not found for video ID: {video_id}")
-                        print("Please upload the video first using option 1.")
-                        return
-                
-                print(f"Found original file: {input_path}")
-                
-                if not os.path.exists(input_path):
-                    print(f"Error: Original file not found at {input_path}")
-                    return
-                
-                output_path = str(self.output_dir / f"edited_{datetime.now().strftime('%Y%m%d_%H%M%S')}.mp4")
-                
-                print(f"\nGenerating FFmpeg command and executing...")
-                print(f"Input: {input_path}")
-                print(f"Output: {output_path}")
-                
-                # Generate and execute FFmpeg command
-                final_path = generate_ffmpeg_from_plan(edit_plan, input_path, output_path)
-                print(f"\nEdit completed successfully! Output saved to: {final_path}")
-                
-            except Exception as e:
-                print(f"\nError during FFmpeg execution: {str(e)}")
-                print("Full error details:", e)
+        if approve is None:
+            print("\nWould you like to proceed with the edit?")
+            print("1. Yes, generate and execute FFmpeg command")
+            print("2. Render a quick low-resolution preview first")
+            print("3. No, exit")
+            
+            choice = input("\nSelect an option (1-3): ").strip()
         else:
+            choice = "1" if approve == "final" else "2"
+        
+        if choice not in ("1", "2"):
             print("\nExiting without generating edit.")
+            return {"status": "cancelled", "clips": len(clips)}
+
+        trims = sum(1 for action in edit_plan.get("actions", []) if action.get("type") == "trim")
+        result = {"status": "done", "clips": len(clips), "trims": trims}
+        # Progress bars of concurrent batch jobs would overwrite each other
+        show_progress = approve is None
+        try:
+            sources = await asyncio.to_thread(self.resolve_plan_sources, edit_plan, clips)
+            if not sources:
+                return {"status": "missing_videos", "clips": len(clips),
+                        "error": "Source files of the edit plan were not found"}
+
+            if choice == "2":
+                preview_path = await asyncio.to_thread(
+                    self.render_plan, edit_plan, sources, True,
+                    output_path if approve == "preview" else None, render_mode, show_progress
+                )
+                result["preview"] = preview_path
+                print(f"\nPreview saved to: {preview_path}")
+                if approve == "preview":
+                    return result
+                if approve is None:
+                    print("\nPromote the preview to a full-quality render?")
+                    print("1. Yes, render the final edit")
+                    print("2. No, exit")
+                    if input("\nSelect an option (1-2): ").strip() != "1":
+                        print("\nExiting without generating the final edit.")
+                        return result
+
+            final_path = await asyncio.to_thread(
+                self.render_plan, edit_plan, sources, False, output_path, render_mode, show_progress
+            )
+            result["output"] = final_path
+            print(f"\nEdit completed successfully! Output saved to: {final_path}")
+            return result
+
+        except Exception as e:
+            print(f"\nError during FFmpeg execution: {str(e)}")
+            print("Full error details:", e)
+            result.update(status="render_error", error=str(e))
+            return result
+
+    def resolve_plan_sources(self, edit_plan: Dict, clips: List[Dict]) -> Optional[Dict[str, str]]:
+        """Map the video IDs used by the plan's trims to their original files."""
+        if not clips:
+            print("No clips found to edit.")
+            return None
+
+        # Trims carry the video_id they are cut from; plans for a
+        # single video may leave it out
+        clip_video_ids = list(dict.fromkeys(clip['video_id'] for clip in clips))
+        trims = [action for action in edit_plan.get("actions", []) if action["type"] == "trim"]
+        for action in trims:
+            if not action.get("video_id") and len(clip_video_ids) == 1:
+                action["video_id"] = clip_video_ids[0]
+        video_ids = list(dict.fromkeys(action.get("video_id") for action in trims))
+        if None in video_ids:
+            print("\nThe edit plan has trims without a video_id.")
+            return None
+
+        print(f"\nLooking up original files for video IDs: {', '.join(video_ids)}")
+        sources = self.resolve_video_paths(video_ids)
+
+        for video_id in video_ids:
+            if video_id not in sources:
+                print(f"\nOriginal file not found for video ID: {video_id}")
+                print("Please upload the video first using option 1.")
+                return None
+            print(f"Found original file: {sources[video_id]}")
+            if not os.path.exists(sources[video_id]):
+                print(f"Error: Original file not found at {sources[video_id]}")
+                return None
+        return sources
+
+    def render_plan(self, edit_plan: Dict, sources: Dict[str, str], preview: bool = False,
+                    output_path: Optional[str] = None, render_mode: Optional[str] = None,
+                    show_progress: bool = True) -> str:
+        """Render a resolved edit plan, either as a fast preview or at full quality.
+
+        Each render works in a temp directory of its own, so renders can run
+        concurrently.
+        """
+        render_mode = render_mode or self.render_mode
+        if not output_path:
+            prefix = "preview" if preview else "edited"
+            timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+            output_path = str(self.output_dir / f"{prefix}_{timestamp}_{uuid.uuid4().hex[:6]}.mp4")
+        Path(output_path).parent.mkdir(parents=True, exist_ok=True)
+        if preview:
+            # Pre-generated proxies make the preview cheaper still
+            sources = preview_sources(sources)
+
+        print(f"\nGenerating FFmpeg command and executing...")
+        print(f"Inputs: {', '.join(sources.values())}")
+        print(f"Output: {output_path}")
+        print(f"Render mode: {'preview' if preview else render_mode}")
+
+        # Generate and execute FFmpeg command
+        work_dir = self.temp_dir / f"render_{uuid.uuid4().hex[:8]}"
+        try:
+            with tracer.span("render", mode=render_mode, preview=preview) as span:
+                output_path = generate_ffmpeg_from_plan(
+                    edit_plan, sources, output_path, mode=render_mode,
+                    workers=self.render_workers, threads=self.ffmpeg_threads,
+                    cache=self.segment_cache, media_info=self.media_info,
+                    preview=preview, progress_callback=print_progress if show_progress else None,
+                    temp_dir=str(work_dir)
+                )
+                span.set(output_bytes=os.path.getsize(output_path))
+        finally:
+            shutil.rmtree(work_dir, ignore_errors=True)
+        return output_path
 
     def cleanup(self, clip_paths: List[str]):
         """Clean up temporary files."""
@@ -320,8 +705,7 @@ class VideoEditor:
             # Save to MongoDB
             self.save_video_metadata(video_id, original_path)
             
-            # Update in-memory mapping
-            self.video_id_to_path[video_id] = original_path
+            self.ensure_preview_proxy(original_path)
             
             print("Successfully added existing video metadata")
         except Exception as e:
@@ -459,5 +843,18 @@ def main_menu():
         input()
 
 
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Reduct AI video editor")
+    parser.add_argument("--batch", metavar="JOBS",
+                        help="Run the edit jobs in a JSONL file ('-' for stdin) without prompting")
+    parser.add_argument("--results", default="batch_results.jsonl",
+                        help="JSONL file a result record per batch job is appended to")
+    parser.add_argument("--concurrency", type=int, default=2, help="Batch jobs run at once")
+    return parser.parse_args()
+
+
 if __name__ == "__main__":
+    args = parse_args()
+    if args.batch:
+        sys.exit(run_batch_cli(VideoEditor(), args.batch, args.results, args.concurrency))
     main_menu()
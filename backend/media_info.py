@@ -0,0 +1,183 @@
+import os
+import threading
+from itertools import accumulate
+from typing import Dict, List, Optional
+
+import ffmpeg
+
+from tracing import tracer
+
+
+# Bumped when the fields or meaning of stored media info change, so older
+# documents are probed again
+MEDIA_INFO_VERSION = 4
+
+
+def probe_keyframes(input_path: str) -> Optional[List[float]]:
+    """Return the sorted keyframe timestamps (in seconds) of the first video stream.
+
+    Timestamps are relative to the start of the file, like -ss and the
+    plan's trims, so a container start_time (about 1.4s in MPEG-TS, or B-frame
+    delay in MP4) is subtracted. Only packet headers are read, so this is a
+    demux pass and does not decode any frames.
+
+    Returns None for all-intra sources (ProRes, DNxHD, ...), where every
+    packet is a keyframe and the list would hold one entry per frame.
+    """
+    probe = ffmpeg.probe(input_path, select_streams='v:0',
+                         show_entries='packet=pts_time,flags:format=start_time')
+    start_time = probe.get("format", {}).get("start_time")
+    offset = float(start_time) if start_time not in (None, "N/A") else 0.0
+    packets = probe.get("packets", [])
+    keyframes = []
+    for packet in packets:
+        pts_time = packet.get("pts_time")
+        if "K" in packet.get("flags", "") and pts_time not in (None, "N/A"):
+            keyframes.append(float(pts_time) - offset)
+    if packets and all("K" in packet.get("flags", "") for packet in packets):
+        return None
+    keyframes.sort()
+    return keyframes
+
+
+def _parse_rate(rate: Optional[str]) -> Optional[float]:
+    """Convert an FFprobe frame rate such as "30000/1001" to a float."""
+    if not rate or rate == "0/0":
+        return None
+    num, _, den = rate.partition("/")
+    return float(num) / float(den or 1)
+
+
+def probe_stream_info(input_path: str) -> Dict:
+    """Return the codec parameters of the first video and audio streams."""
+    probe = ffmpeg.probe(input_path)
+    video = next((s for s in probe["streams"] if s.get("codec_type") == "video"), {})
+    audio = next((s for s in probe["streams"] if s.get("codec_type") == "audio"), {})
+    duration = probe.get("format", {}).get("duration")
+    # Containers such as MKV carry no per-stream bitrate; fall back to the file's
+    bit_rate = video.get("bit_rate") or probe.get("format", {}).get("bit_rate")
+    return {
+        "duration": float(duration) if duration else None,
+        "bit_rate": int(bit_rate) if bit_rate not in (None, "N/A") else None,
+        "vcodec": video.get("codec_name"),
+        "pix_fmt": video.get("pix_fmt"),
+        "profile": video.get("profile"),
+        "level": video.get("level"),
+        "width": video.get("width"),
+        "height": video.get("height"),
+        "fps": _parse_rate(video.get("avg_frame_rate") or video.get("r_frame_rate")),
+        "acodec": audio.get("codec_name"),
+        "sample_rate": audio.get("sample_rate"),
+        "channels": audio.get("channels"),
+    }
+
+
+def file_signature(path: str) -> Dict:
+    """Size and mtime used to tell whether stored media info is still valid."""
+    stat = os.stat(path)
+    return {"size": stat.st_size, "mtime": stat.st_mtime}
+
+
+def encode_keyframes(keyframes: List[float]) -> List[List[int]]:
+    """Run-length encode keyframe timestamps as [delta_ms, count] pairs.
+
+    Deltas are taken between integer milliseconds, starting from 0, so a
+    fixed GOP length collapses to a few pairs however long the file is.
+    """
+    runs: List[List[int]] = []
+    previous = 0
+    for ms in (round(t * 1000) for t in keyframes):
+        delta = ms - previous
+        previous = ms
+        if runs and runs[-1][0] == delta:
+            runs[-1][1] += 1
+        else:
+            runs.append([delta, 1])
+    return runs
+
+
+def decode_keyframes(runs: List[List[int]]) -> List[float]:
+    """Keyframe timestamps in seconds from encode_keyframes output."""
+    deltas = (delta for delta, count in runs for _ in range(count))
+    return [ms / 1000 for ms in accumulate(deltas)]
+
+
+def probe_media(path: str) -> Dict:
+    """Probe a file's stream parameters and keyframe index.
+
+    All-intra sources are stored with an "all_intra" flag instead of a
+    keyframe list; other sources store their keyframes run-length encoded
+    under "keyframe_runs_ms" to keep the document small.
+    """
+    with tracer.span("ffprobe", path=path) as span:
+        info = file_signature(path)
+        info["version"] = MEDIA_INFO_VERSION
+        info.update(probe_stream_info(path))
+        keyframes = probe_keyframes(path)
+        info["all_intra"] = keyframes is None
+        if keyframes is not None:
+            info["keyframe_runs_ms"] = encode_keyframes(keyframes)
+        span.set(keyframes=len(keyframes) if keyframes is not None else "all")
+    return info
+
+
+def keyframe_times(info: Dict) -> Optional[List[float]]:
+    """Keyframe timestamps in seconds from a media info document.
+
+    None means every frame is a keyframe (see probe_keyframes).
+    """
+    if info.get("all_intra"):
+        return None
+    return decode_keyframes(info.get("keyframe_runs_ms", []))
+
+
+def is_current(info: Optional[Dict], path: str) -> bool:
+    """Check that media info was probed from the file as it is now, by this version."""
+    if not info or info.get("version") != MEDIA_INFO_VERSION:
+        return False
+    try:
+        return file_signature(path) == {"size": info.get("size"), "mtime": info.get("mtime")}
+    except OSError:
+        return False
+
+
+class MediaInfoStore:
+    """Media info for source files, probed once and kept with the video metadata.
+
+    Info is cached in memory per path and, when a collection is given, stored
+    under "media_info" on the metadata documents whose original_path matches.
+    A file whose size or mtime changed, or info stored by an older
+    MEDIA_INFO_VERSION, is probed again.
+    """
+
+    def __init__(self, collection=None):
+        self.collection = collection
+        self._memory: Dict[str, Dict] = {}
+        self._lock = threading.Lock()
+
+    def probe(self, path: str) -> Dict:
+        """Probe path and remember the result without persisting it."""
+        info = probe_media(path)
+        with self._lock:
+            self._memory[path] = info
+        return info
+
+    def get(self, path: str) -> Dict:
+        """Return current media info for path, probing only if nothing valid is stored."""
+        with self._lock:
+            info = self._memory.get(path)
+        if is_current(info, path):
+            return info
+
+        if self.collection is not None:
+            doc = self.collection.find_one({"original_path": path}, {"media_info": 1})
+            info = doc.get("media_info") if doc else None
+            if is_current(info, path):
+                with self._lock:
+                    self._memory[path] = info
+                return info
+
+        info = self.probe(path)
+        if self.collection is not None:
+            self.collection.update_many({"original_path": path}, {"$set": {"media_info": info}})
+        return info
@@ -0,0 +1,160 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional
+
+# Fields of a metadata document kept in memory
+CACHED_FIELDS = ("video_id", "original_path", "fingerprint", "uploaded_at")
+
+# _id of the document in the state collection holding the metadata version stamp
+VERSION_ID = "metadata_version"
+
+
+def ensure_indexes(collection) -> None:
+    """Index the metadata collection for its lookups; video_id is unique.
+
+    create_index is a no-op for indexes that already exist. A unique index
+    cannot be built over existing duplicates, which is reported, not raised.
+    """
+    for field, unique in (("video_id", True), ("fingerprint", False), ("original_path", False)):
+        try:
+            collection.create_index(field, unique=unique)
+        except Exception as e:
+            print(f"Warning: Could not create index on {field}: {str(e)}")
+
+
+class MetadataCache:
+    """In-memory LRU of video metadata documents, keyed by video_id.
+
+    The whole collection is bulk-loaded (projected to CACHED_FIELDS) on first
+    use. Writers bump a version stamp kept in state_collection, and the cache
+    reloads when it sees the stamp change; the stamp is checked at most every
+    check_interval seconds. While every document fits in max_entries the
+    cache is complete and a miss means the video is unknown; otherwise
+    misses are looked up in MongoDB.
+    """
+
+    def __init__(self, collection, state_collection, max_entries: int = 10000,
+                 check_interval: float = 5.0):
+        self.collection = collection
+        self.state_collection = state_collection
+        self.max_entries = max_entries
+        self.check_interval = check_interval
+        self._entries: "OrderedDict[str, Dict]" = OrderedDict()
+        self._by_fingerprint: Dict[str, str] = {}
+        self._version = None
+        self._checked_at: Optional[float] = None
+        self._complete = False
+        self._lock = threading.Lock()
+
+    def _read_version(self):
+        doc = self.state_collection.find_one({"_id": VERSION_ID}, {"version": 1})
+        return doc.get("version", 0) if doc else 0
+
+    def _store(self, doc: Dict) -> None:
+        video_id = doc["video_id"]
+        old = self._entries.pop(video_id, None)
+        if old and old.get("fingerprint"):
+            self._by_fingerprint.pop(old["fingerprint"], None)
+        self._entries[video_id] = doc
+        if doc.get("fingerprint"):
+            self._by_fingerprint[doc["fingerprint"]] = video_id
+        while len(self._entries) > self.max_entries:
+            _, evicted = self._entries.popitem(last=False)
+            self._by_fingerprint.pop(evicted.get("fingerprint"), None)
+            self._complete = False
+
+    def load(self) -> None:
+        """Replace the cache with up to max_entries documents from the collection."""
+        version = self._read_version()
+        projection = {field: 1 for field in CACHED_FIELDS}
+        projection["_id"] = 0
+        with self._lock:
+            self._entries.clear()
+            self._by_fingerprint.clear()
+            self._complete = True
+            count = 0
+            for doc in self.collection.find({}, projection):
+                if count >= self.max_entries:
+                    self._complete = False
+                    break
+                self._store(doc)
+                count += 1
+            self._version = version
+            self._checked_at = time.monotonic()
+        print(f"Loaded metadata of {len(self._entries)} videos")
+
+    def _refresh(self) -> None:
+        """Load on first use, and reload when another writer changed the collection."""
+        with self._lock:
+            loaded = self._checked_at is not None
+            due = loaded and time.monotonic() - self._checked_at >= self.check_interval
+        if not loaded:
+            self.load()
+        elif due:
+            version = self._read_version()
+            with self._lock:
+                self._checked_at = time.monotonic()
+                stale = version != self._version
+            if stale:
+                self.load()
+
+    def get_many(self, video_ids: Iterable[str]) -> Dict[str, Dict]:
+        """Metadata of the given videos that exist, from memory where possible."""
+        video_ids = list(dict.fromkeys(video_ids))
+        self._refresh()
+        with self._lock:
+            found = {video_id: self._entries[video_id] for video_id in video_ids if video_id in self._entries}
+            for video_id in found:
+                self._entries.move_to_end(video_id)
+            complete = self._complete
+        missing = [video_id for video_id in video_ids if video_id not in found]
+        if missing and not complete:
+            projection = {field: 1 for field in CACHED_FIELDS}
+            projection["_id"] = 0
+            documents = list(self.collection.find({"video_id": {"$in": missing}}, projection))
+            with self._lock:
+                for doc in documents:
+                    self._store(doc)
+                    found[doc["video_id"]] = doc
+        return found
+
+    def find_by_fingerprint(self, content_fingerprint: str) -> Optional[Dict]:
+        """Metadata of the video with the given content fingerprint, if any."""
+        self._refresh()
+        with self._lock:
+            video_id = self._by_fingerprint.get(content_fingerprint)
+            if video_id is not None:
+                return self._entries[video_id]
+            if self._complete:
+                return None
+        projection = {field: 1 for field in CACHED_FIELDS}
+        projection["_id"] = 0
+        doc = self.collection.find_one({"fingerprint": content_fingerprint}, projection)
+        if doc:
+            with self._lock:
+                self._store(doc)
+        return doc
+
+    def update(self, documents: List[Dict]) -> None:
+        """Record writes to videos' documents and bump the version stamp for other processes.
+
+        Each document holds a video_id and the fields written. The cache
+        adopts the new stamp only if no other writer bumped it in between,
+        so their changes still trigger a reload.
+        """
+        from pymongo import ReturnDocument
+
+        # One round trip bumps the stamp and returns its new value
+        state = self.state_collection.find_one_and_update(
+            {"_id": VERSION_ID}, {"$inc": {"version": 1}}, projection={"version": 1},
+            upsert=True, return_document=ReturnDocument.AFTER,
+        )
+        version = state.get("version", 0) if state else 0
+        with self._lock:
+            for fields in documents:
+                doc = dict(self._entries.get(fields["video_id"], {}))
+                doc.update({field: value for field, value in fields.items() if field in CACHED_FIELDS})
+                self._store(doc)
+            if self._version is not None and version == (self._version or 0) + 1:
+                self._version = version
@@ -0,0 +1,399 @@
+"""In-process stand-ins for Twelvelabs, Gemini and MongoDB.
+
+With REDUCT_OFFLINE=1 the module-level clients in twelve.py, prompt.py and
+main.py are built from here instead, so process_edit can run end to end
+without network access or API keys, e.g. for benchmarks and regression runs.
+
+Behaviour is tuned through environment variables:
+    OFFLINE_LATENCY       seconds added to every API call (default 0.05)
+    OFFLINE_FAILURE_RATE  fraction of API calls that fail with a 429 or 5xx (default 0)
+    OFFLINE_INDEX_TIME    seconds a task takes to index after upload (default 1)
+    OFFLINE_DB_LATENCY    seconds added to every database operation (default 0)
+    OFFLINE_SEED          seed of the failure injection, for reproducible runs
+"""
+import copy
+import hashlib
+import json
+import os
+import random
+import re
+import threading
+import time
+import uuid
+from types import SimpleNamespace
+from typing import Dict, List, Optional
+
+import ffmpeg
+
+OFFLINE = os.getenv("REDUCT_OFFLINE", "0") == "1"
+
+# Length of the clips the offline index cuts each video into, and the most clips per video
+CLIP_SECONDS = 5.0
+MAX_CLIPS_PER_VIDEO = 50
+
+
+class OfflineAPIError(Exception):
+    """An injected API failure, shaped like the SDK errors RateLimitedClient inspects."""
+
+    def __init__(self, status_code: int, endpoint: str):
+        super().__init__(f"Injected {status_code} from offline {endpoint}")
+        self.status_code = status_code
+        self.response = SimpleNamespace(status_code=status_code, headers={})
+
+
+class FaultInjector:
+    """Adds latency to calls and fails a fraction of them."""
+
+    def __init__(self, latency: float = 0.0, failure_rate: float = 0.0, seed: Optional[int] = None):
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls, latency_var: str = "OFFLINE_LATENCY", default_latency: str = "0.05",
+                 failure_var: Optional[str] = "OFFLINE_FAILURE_RATE") -> "FaultInjector":
+        seed = os.getenv("OFFLINE_SEED")
+        return cls(
+            latency=float(os.getenv(latency_var, default_latency)),
+            failure_rate=float(os.getenv(failure_var, "0")) if failure_var else 0.0,
+            seed=int(seed) if seed else None,
+        )
+
+    def __call__(self, endpoint: str) -> None:
+        if self.latency > 0:
+            time.sleep(self.latency)
+        with self._lock:
+            failed = self._random.random() < self.failure_rate
+            status = self._random.choice((429, 500, 503))
+        if failed:
+            raise OfflineAPIError(status, endpoint)
+
+
+def _score(*parts: str) -> float:
+    """Deterministic pseudo-relevance in [0.3, 0.95) for a query and clip."""
+    digest = hashlib.sha256("|".join(parts).encode()).digest()
+    return round(0.3 + 0.65 * int.from_bytes(digest[:4], "big") / 2 ** 32, 4)
+
+
+def _duration(path: str) -> float:
+    try:
+        return float(ffmpeg.probe(path)["format"]["duration"])
+    except Exception:
+        return 60.0
+
+
+class OfflineTask:
+    """Mimics twelvelabs.models.task.Task: id, status, video_id and wait_for_done."""
+
+    def __init__(self, index: "OfflineTwelveLabs", task_id: str, index_id: str, path: str):
+        self._index = index
+        self.id = task_id
+        self.index_id = index_id
+        self.path = path
+        self.status = "pending"
+        self.video_id: Optional[str] = None
+        self.created = time.monotonic()
+
+    def wait_for_done(self, sleep_interval: float = 0.5, callback=None) -> "OfflineTask":
+        while self.status not in ("ready", "failed"):
+            time.sleep(sleep_interval)
+            self._index.task.retrieve(self.id)
+            if callback:
+                callback(self)
+        return self
+
+
+class _OfflineTaskResource:
+    def __init__(self, index: "OfflineTwelveLabs"):
+        self._index = index
+
+    def create(self, index_id: str, file: str, **kwargs) -> OfflineTask:
+        self._index.faults("task.create")
+        task = OfflineTask(self._index, uuid.uuid4().hex[:24], index_id, file)
+        with self._index.lock:
+            self._index.tasks[task.id] = task
+        return task
+
+    def retrieve(self, task_id: str, **kwargs) -> OfflineTask:
+        self._index.faults("task.retrieve")
+        with self._index.lock:
+            task = self._index.tasks[task_id]
+            if task.status == "pending":
+                task.status = "indexing"
+                return task
+            indexed = task.status == "indexing" and time.monotonic() - task.created >= self._index.index_time
+        if indexed:
+            duration = _duration(task.path)
+            with self._index.lock:
+                if task.status == "indexing":
+                    task.video_id = uuid.uuid4().hex[:24]
+                    self._index.videos[task.video_id] = (task.index_id, duration)
+                    task.status = "ready"
+        return task
+
+
+class _OfflineSearchResource:
+    def __init__(self, index: "OfflineTwelveLabs"):
+        self._index = index
+        self._pages: Dict[str, List] = {}
+
+    def _clips(self, index_id: str, query_text: str, video_id: Optional[str]) -> List[SimpleNamespace]:
+        with self._index.lock:
+            videos = [
+                (vid, duration) for vid, (vid_index, duration) in self._index.videos.items()
+                if vid_index == index_id and video_id in (None, vid)
+            ]
+        clips = []
+        for vid, duration in videos:
+            count = min(MAX_CLIPS_PER_VIDEO, max(1, int(duration // CLIP_SECONDS)))
+            for i in range(count):
+                start = i * CLIP_SECONDS
+                clips.append(SimpleNamespace(
+                    score=_score(query_text.lower(), vid, str(i)),
+                    start=start,
+                    end=min(duration, start + CLIP_SECONDS),
+                    video_id=vid,
+                    thumbnail_url=f"offline://{vid}/{i}.jpg",
+                ))
+        clips.sort(key=lambda clip: clip.score, reverse=True)
+        return clips
+
+    def _page(self, clips: List, page_limit: int) -> SimpleNamespace:
+        token = None
+        if len(clips) > page_limit:
+            token = uuid.uuid4().hex
+            self._pages[token] = (clips[page_limit:], page_limit)
+        return SimpleNamespace(data=clips[:page_limit], page_info=SimpleNamespace(next_page_token=token))
+
+    def query(self, index_id: str, query_text: str, options=None, page_limit: int = 10,
+              video_id: Optional[str] = None, **kwargs) -> SimpleNamespace:
+        self._index.faults("search.query")
+        return self._page(self._clips(index_id, query_text, video_id), page_limit)
+
+    def by_page_token(self, page_token: str, **kwargs) -> SimpleNamespace:
+        self._index.faults("search.by_page_token")
+        clips, page_limit = self._pages.pop(page_token)
+        return self._page(clips, page_limit)
+
+
+class OfflineTwelveLabs:
+    """Stand-in for the TwelveLabs client covering task create/retrieve and search.
+
+    Uploaded files are "indexed" after index_time seconds; searches then
+    return fixed-length clips of every indexed video with scores derived
+    from a hash of the query, so repeated runs see the same results.
+    """
+
+    def __init__(self, faults: Optional[FaultInjector] = None, index_time: Optional[float] = None):
+        self.faults = faults or FaultInjector.from_env()
+        self.index_time = index_time if index_time is not None else float(os.getenv("OFFLINE_INDEX_TIME", "1"))
+        self.lock = threading.Lock()
+        self.tasks: Dict[str, OfflineTask] = {}
+        self.videos: Dict[str, tuple] = {}  # video_id -> (index_id, duration)
+        self.task = _OfflineTaskResource(self)
+        self.search = _OfflineSearchResource(self)
+
+    def reset(self) -> None:
+        """Forget every task and indexed video."""
+        with self.lock:
+            self.tasks.clear()
+            self.videos.clear()
+        self.search = _OfflineSearchResource(self)
+
+
+def _seconds_to_time(seconds: float) -> str:
+    seconds = int(seconds)
+    return f"{seconds // 3600:02d}:{seconds % 3600 // 60:02d}:{seconds % 60:02d}"
+
+
+class _OfflineModels:
+    def __init__(self, faults: FaultInjector):
+        self._faults = faults
+
+    def generate_content(self, model: str, contents: List[str], **kwargs) -> SimpleNamespace:
+        """Answer the prompt analysis and edit plan prompts with well-formed JSON."""
+        self._faults("models.generate_content")
+        prompt = "\n".join(str(part) for part in contents)
+        if "Video segments:" in prompt:
+            return SimpleNamespace(text=json.dumps(self._edit_plan(prompt)))
+
+        match = re.search(r'Their request is: "(.*)"', prompt)
+        request = match.group(1) if match else prompt.strip()
+        return SimpleNamespace(text=json.dumps({
+            "search_queries": [request],
+            "editing_actions": ["cut"],
+            "target_videos": ["all_indexed_videos"],
+        }))
+
+    @staticmethod
+    def _edit_plan(prompt: str) -> Dict:
+        """Trim every segment listed in the prompt, in order, and concatenate them."""
+        segments_text = prompt.split("Video segments:", 1)[1].lstrip()
+        clips, _ = json.JSONDecoder().raw_decode(segments_text)
+        actions = []
+        for i, clip in enumerate(clips):
+            start = int(clip["start_time"])
+            end = max(start + 1, int(clip["end_time"]))
+            actions.append({
+                "type": "trim",
+                "video_id": clip["video_id"],
+                "start": _seconds_to_time(start),
+                "end": _seconds_to_time(end),
+                "output": f"segment_{i}.mp4",
+            })
+        actions.append({
+            "type": "concat",
+            "segments": [{"file": f"segment_{i}.mp4", "position": i} for i in range(len(clips))],
+        })
+        return {"actions": actions}
+
+
+class OfflineGemini:
+    """Stand-in for genai.Client exposing models.generate_content."""
+
+    def __init__(self, faults: Optional[FaultInjector] = None):
+        self.models = _OfflineModels(faults or FaultInjector.from_env())
+
+
+class _UpdateResult:
+    def __init__(self, matched_count: int, modified_count: int, upserted_id=None):
+        self.matched_count = matched_count
+        self.modified_count = modified_count
+        self.upserted_id = upserted_id
+
+
+def _matches(document: Dict, query: Dict) -> bool:
+    for field, condition in query.items():
+        value = document.get(field)
+        if isinstance(condition, dict) and "$in" in condition:
+            if value not in condition["$in"]:
+                return False
+        elif value != condition:
+            return False
+    return True
+
+
+def _project(document: Dict, projection: Optional[Dict]) -> Dict:
+    document = copy.deepcopy(document)
+    if not projection:
+        return document
+    included = {field for field, keep in projection.items() if keep and field != "_id"}
+    if included:
+        document = {field: value for field, value in document.items() if field in included or field == "_id"}
+    if projection.get("_id", 1) == 0:
+        document.pop("_id", None)
+    return document
+
+
+class OfflineCollection:
+    """In-memory collection supporting the subset of pymongo the editor uses."""
+
+    def __init__(self, name: str, faults: FaultInjector):
+        self.name = name
+        self._faults = faults
+        self._documents: List[Dict] = []
+        # Reentrant, so find_one_and_update can find and update as one step
+        self._lock = threading.RLock()
+
+    def find(self, query: Optional[Dict] = None, projection: Optional[Dict] = None) -> List[Dict]:
+        self._faults(f"{self.name}.find")
+        with self._lock:
+            return [_project(doc, projection) for doc in self._documents if _matches(doc, query or {})]
+
+    def find_one(self, query: Optional[Dict] = None, projection: Optional[Dict] = None) -> Optional[Dict]:
+        found = self.find(query, projection)
+        return found[0] if found else None
+
+    def insert_one(self, document: Dict) -> SimpleNamespace:
+        self._faults(f"{self.name}.insert_one")
+        document = copy.deepcopy(document)
+        document.setdefault("_id", uuid.uuid4().hex[:24])
+        with self._lock:
+            self._documents.append(document)
+        return SimpleNamespace(inserted_id=document["_id"])
+
+    def _update(self, query: Dict, update: Dict, upsert: bool, many: bool) -> _UpdateResult:
+        self._faults(f"{self.name}.update")
+        changes = update.get("$set", {})
+        increments = update.get("$inc", {})
+        with self._lock:
+            matched = [doc for doc in self._documents if _matches(doc, query)]
+            if not many:
+                matched = matched[:1]
+            modified = 0
+            for doc in matched:
+                if increments or any(doc.get(field) != value for field, value in changes.items()):
+                    doc.update(copy.deepcopy(changes))
+                    for field, amount in increments.items():
+                        doc[field] = doc.get(field, 0) + amount
+                    modified += 1
+            if matched or not upsert:
+                return _UpdateResult(len(matched), modified)
+            document = {field: value for field, value in query.items() if not isinstance(value, dict)}
+            document.update(copy.deepcopy(changes))
+            document.update(increments)
+            document.setdefault("_id", uuid.uuid4().hex[:24])
+            self._documents.append(document)
+            return _UpdateResult(0, 0, document["_id"])
+
+    def update_one(self, query: Dict, update: Dict, upsert: bool = False) -> _UpdateResult:
+        return self._update(query, update, upsert, many=False)
+
+    def update_many(self, query: Dict, update: Dict, upsert: bool = False) -> _UpdateResult:
+        return self._update(query, update, upsert, many=True)
+
+    def find_one_and_update(self, query: Dict, update: Dict, projection: Optional[Dict] = None,
+                            upsert: bool = False, return_document: bool = False) -> Optional[Dict]:
+        """Update the first match and return it, as it is after the update when
+        return_document is true (pymongo's ReturnDocument.AFTER)."""
+        with self._lock:
+            before = self.find_one(query, projection)
+            result = self._update(query, update, upsert, many=False)
+            if not return_document:
+                return before
+            if result.upserted_id is not None:
+                return self.find_one({"_id": result.upserted_id}, projection)
+            return self.find_one(query, projection)
+
+    def bulk_write(self, requests: List, ordered: bool = True) -> SimpleNamespace:
+        """Apply pymongo UpdateOne requests, reading the fields pymongo keeps on them."""
+        self._faults(f"{self.name}.bulk_write")
+        matched = modified = upserted = 0
+        for request in requests:
+            result = self._update(request._filter, request._doc, bool(request._upsert), many=False)
+            matched += result.matched_count
+            modified += result.modified_count
+            upserted += int(result.upserted_id is not None)
+        return SimpleNamespace(acknowledged=True, matched_count=matched,
+                               modified_count=modified, upserted_count=upserted)
+
+    def create_index(self, keys, unique: bool = False, **kwargs) -> str:
+        """Accept index definitions; lookups scan the in-memory documents regardless."""
+        return f"{keys}_1"
+
+
+class OfflineDatabase:
+    def __init__(self, name: str, faults: FaultInjector):
+        self.name = name
+        self._faults = faults
+        self._collections: Dict[str, OfflineCollection] = {}
+
+    def __getitem__(self, name: str) -> OfflineCollection:
+        return self._collections.setdefault(name, OfflineCollection(name, self._faults))
+
+
+class OfflineMongoClient:
+    """Stand-in for pymongo.MongoClient holding its databases in memory."""
+
+    def __init__(self, faults: Optional[FaultInjector] = None):
+        self._faults = faults or FaultInjector.from_env("OFFLINE_DB_LATENCY", "0", failure_var=None)
+        self._databases: Dict[str, OfflineDatabase] = {}
+
+    def __getitem__(self, name: str) -> OfflineDatabase:
+        return self._databases.setdefault(name, OfflineDatabase(name, self._faults))
+
+    def reset(self) -> None:
+        """Empty every collection, keeping existing database handles valid."""
+        for database in self._databases.values():
+            database._collections.clear()
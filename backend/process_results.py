@@ -1,5 +1,5 @@
 from typing import List, Dict
-from twelve import search_video, client, INDEX_ID
+from twelve import search_video, iter_search
 
 class ClipProcessor:
     def __init__(self):
@@ -20,44 +20,15 @@ class ClipProcessor:
         # Reset processed clips list
         self.processed_clips = []
         
-        # Get search results
-        search_params = {
-            "index_id": INDEX_ID,
-            "options": ["visual", "audio"],
-            "query_text": query,
-            "group_by": "clip",
-            "operator": "or",
-            "page_limit": 5,
-            "sort_option": "score",
-        }
+        # Walk result pages until scores drop below the threshold
+        search_params = {}
         
         # Add video_id filter if provided
         if video_id:
             search_params["video_id"] = video_id
         
-        result = client.search.query(**search_params)
-        
-        # Process and store clips
-        for item in result.data:
-            if hasattr(item, 'clips'):  # GroupByVideoSearchData
-                for clip in item.clips:
-                    if clip.score >= min_score:
-                        self.processed_clips.append({
-                            'video_id': clip.video_id,
-                            'start_time': clip.start,
-                            'end_time': clip.end,
-                            'score': clip.score,
-                            'thumbnail_url': clip.thumbnail_url
-                        })
-            else:  # Regular SearchData
-                if item.score >= min_score:
-                    self.processed_clips.append({
-                        'video_id': item.video_id,
-                        'start_time': item.start,
-                        'end_time': item.end,
-                        'score': item.score,
-                        'thumbnail_url': item.thumbnail_url
-                    })
+        for clip in iter_search(query, min_score=min_score, **search_params):
+            self.processed_clips.append(clip)
         
         # Sort by score in descending order
         self.processed_clips.sort(key=lambda x: x['score'], reverse=True)
@@ -73,3 +44,41 @@ class ClipProcessor:
         if not self.processed_clips:
             return None
         return self.processed_clips[0]
+
+
+def merge_clips(clips: List[Dict], max_gap: float = 1.0) -> List[Dict]:
+    """
+    Merge overlapping or near-adjacent clips of the same video.
+
+    Clips are swept in start order per video_id; a clip starting no more than
+    max_gap seconds after the current range ends is folded into it. A merged
+    clip keeps the best score and that clip's thumbnail.
+
+    Args:
+        clips (List[Dict]): Clips as returned by search_video
+        max_gap (float): Largest gap in seconds between clips that are merged
+
+    Returns:
+        List[Dict]: Merged clips sorted by score in descending order
+    """
+    by_video: Dict[str, List[Dict]] = {}
+    for clip in clips:
+        by_video.setdefault(clip['video_id'], []).append(clip)
+
+    merged = []
+    for video_clips in by_video.values():
+        video_clips.sort(key=lambda x: x['start_time'])
+        current = dict(video_clips[0])
+        for clip in video_clips[1:]:
+            if clip['start_time'] <= current['end_time'] + max_gap:
+                current['end_time'] = max(current['end_time'], clip['end_time'])
+                if clip['score'] > current['score']:
+                    current['score'] = clip['score']
+                    current['thumbnail_url'] = clip['thumbnail_url']
+            else:
+                merged.append(current)
+                current = dict(clip)
+        merged.append(current)
+
+    merged.sort(key=lambda x: x['score'], reverse=True)
+    return merged
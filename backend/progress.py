@@ -0,0 +1,132 @@
+import subprocess
+import sys
+import threading
+import time
+from dataclasses import dataclass
+from typing import Callable, Dict, Optional
+
+import ffmpeg
+
+
+@dataclass
+class ProgressUpdate:
+    label: str  # FFmpeg step the update is for, e.g. a segment file name
+    percent: float  # Progress of this step
+    overall_percent: float  # Progress of the whole render
+    fps: Optional[float]  # Frames encoded per second by this step
+    speed: Optional[float]  # Media seconds processed per wall-clock second
+    eta: Optional[float]  # Estimated seconds until the whole render finishes
+    done: bool  # Whether this step has finished
+
+
+def _parse_float(value: Optional[str]) -> Optional[float]:
+    """Parse an FFmpeg progress value such as "1.5x" or "N/A"."""
+    if not value:
+        return None
+    try:
+        return float(value.rstrip("x"))
+    except ValueError:
+        return None
+
+
+class RenderProgress:
+    """Runs FFmpeg steps with -progress and reports per-step and overall progress.
+
+    Steps may run in parallel threads. Overall progress is measured in media
+    seconds against total_seconds, the estimated duration of all steps, and
+    the ETA is derived from the throughput achieved so far.
+    """
+
+    def __init__(self, total_seconds: float, callback: Callable[[ProgressUpdate], None]):
+        self.total_seconds = max(total_seconds, 0.001)
+        self.callback = callback
+        self._finished_seconds = 0.0
+        self._running: Dict[str, float] = {}  # label -> media seconds processed so far
+        self._started = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _report(self, label: str, processed: float, duration: float,
+                fps: Optional[float], speed: Optional[float], done: bool) -> None:
+        with self._lock:
+            if done:
+                self._running.pop(label, None)
+                self._finished_seconds += duration
+            else:
+                self._running[label] = processed
+            overall = self._finished_seconds + sum(self._running.values())
+        elapsed = time.monotonic() - self._started
+        throughput = overall / elapsed if elapsed > 0 else 0
+        eta = (self.total_seconds - overall) / throughput if throughput > 0 else None
+        self.callback(ProgressUpdate(
+            label=label,
+            percent=100.0 if done else min(100.0, 100.0 * processed / max(duration, 0.001)),
+            overall_percent=min(100.0, 100.0 * overall / self.total_seconds),
+            fps=fps,
+            speed=speed,
+            eta=max(eta, 0.0) if eta is not None else None,
+            done=done,
+        ))
+
+    def skip(self, label: str, duration: float) -> None:
+        """Count a step that needed no FFmpeg run, such as a cached segment."""
+        self._report(label, duration, duration, None, None, True)
+
+    def run(self, stream, label: str, duration: float,
+            popen: Callable[..., subprocess.Popen] = subprocess.Popen) -> None:
+        """Run an FFmpeg stream spec, reporting progress as it encodes.
+
+        popen starts the FFmpeg process; callers pass their own to keep hold
+        of it, e.g. to terminate it.
+
+        Raises:
+            ffmpeg.Error: If FFmpeg exits with a non-zero status
+        """
+        args = ffmpeg.compile(stream, overwrite_output=True)
+        args = args[:1] + ["-progress", "pipe:1", "-nostats"] + args[1:]
+        process = popen(args, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+
+        # Drain stderr on the side so FFmpeg never blocks on a full pipe
+        stderr_chunks = []
+        stderr_reader = threading.Thread(target=lambda: stderr_chunks.append(process.stderr.read()))
+        stderr_reader.start()
+
+        fields: Dict[str, str] = {}
+        for raw_line in process.stdout:
+            key, _, value = raw_line.decode(errors="replace").strip().partition("=")
+            if key != "progress":
+                fields[key] = value
+                continue
+            out_time_us = _parse_float(fields.get("out_time_us") or fields.get("out_time_ms"))
+            processed = out_time_us / 1_000_000 if out_time_us else 0.0
+            if value != "end":
+                self._report(label, min(processed, duration), duration,
+                             _parse_float(fields.get("fps")), _parse_float(fields.get("speed")), False)
+            fields = {}
+
+        process.wait()
+        stderr_reader.join()
+        stderr = b"".join(chunk for chunk in stderr_chunks if chunk)
+        if process.returncode != 0:
+            raise ffmpeg.Error("ffmpeg", b"", stderr)
+        self._report(label, duration, duration, None, None, True)
+
+
+def _format_seconds(seconds: float) -> str:
+    minutes, seconds = divmod(int(seconds), 60)
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours}:{minutes:02d}:{seconds:02d}"
+
+
+def print_progress(update: ProgressUpdate) -> None:
+    """Progress callback for the CLI, rewriting a single status line."""
+    parts = [f"{update.label}: {update.percent:5.1f}%", f"overall {update.overall_percent:5.1f}%"]
+    if update.fps is not None:
+        parts.append(f"{update.fps:.0f} fps")
+    if update.speed is not None:
+        parts.append(f"{update.speed:.2f}x")
+    if update.eta is not None:
+        parts.append(f"ETA {_format_seconds(update.eta)}")
+    sys.stdout.write("\r" + " | ".join(parts).ljust(79))
+    if update.overall_percent >= 100.0:
+        sys.stdout.write("\n")
+    sys.stdout.flush()
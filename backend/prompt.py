@@ -1,17 +1,27 @@
-from google import genai
 import os
 from dotenv import load_dotenv
 from typing import List, Dict
 import ffmpeg
 import json
+from offline import OFFLINE, OfflineGemini
+from lazy import LazyClient
 
 load_dotenv()
 
 GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
-if not GEMINI_API_KEY:
-    raise ValueError("GEMINI_API_KEY environment variable is not set")
 
-gemini_client = genai.Client(api_key=GEMINI_API_KEY)
+
+def _make_gemini_client():
+    if OFFLINE:
+        return OfflineGemini()
+    if not GEMINI_API_KEY:
+        raise ValueError("GEMINI_API_KEY environment variable is not set")
+    from google import genai
+    return genai.Client(api_key=GEMINI_API_KEY)
+
+
+# Shared with main.py; the SDK is imported and the client built on first use
+gemini_client = LazyClient(_make_gemini_client)
 
 
 def generate_prompt(query: str, clip_data: List[Dict]) -> str:
@@ -30,6 +40,7 @@ Each action in the array must follow one of these structures:
 1. For trimming segments (ALWAYS use this before concat):
 {{
   "type": "trim",
+  "video_id": "...",  // video_id of the segment this trim is cut from
   "start": "HH:MM:SS",
   "end": "HH:MM:SS",
   "output": "segment_X.mp4"  // Unique output filename for this segment
@@ -62,18 +73,21 @@ IMPORTANT RULES:
 5. Positions in concat must be sequential starting from 0
 6. No gaps in position numbers
 7. The final video should have a continuous sequence of clips
+8. Each trim action MUST carry the video_id of the segment it was taken from; segments may come from different videos
 
 Example of a valid response:
 {{
   "actions": [
     {{
       "type": "trim",
+      "video_id": "6818a4c2f1e2d3b4a5c6d7e8",
       "start": "00:00:58",
       "end": "00:01:03",
       "output": "segment_0.mp4"
     }},
     {{
       "type": "trim",
+      "video_id": "6818a4c2f1e2d3b4a5c6d7e8",
       "start": "00:01:20",
       "end": "00:01:25",
       "output": "segment_1.mp4"
@@ -111,6 +125,7 @@ IMPORTANT:
 9. Ensure all segments maintain proper audio synchronization
 10. Follow the clip ordering rules strictly - positions must be sequential
 11. Never skip position numbers or use arbitrary large numbers
+12. Every trim action MUST include the "video_id" of its source segment
 """
 
     try:
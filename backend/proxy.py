@@ -0,0 +1,65 @@
+import hashlib
+import os
+from pathlib import Path
+from typing import Dict, Optional
+
+import ffmpeg
+
+from tracing import tracer
+
+# Frame height of preview renders and preview proxy files
+PREVIEW_HEIGHT = 360
+
+# Frame height of the proxies uploaded for indexing instead of the masters
+UPLOAD_HEIGHT = 720
+
+
+def proxy_path_for(input_path: str, proxy_dir: str = "proxies", height: int = PREVIEW_HEIGHT) -> Path:
+    """Where the proxy of input_path at the given height is kept."""
+    digest = hashlib.sha1(os.path.abspath(input_path).encode()).hexdigest()[:8]
+    return Path(proxy_dir) / f"{Path(input_path).stem}_{digest}_{height}p.mp4"
+
+
+def make_proxy(input_path: str, output_path: Optional[str] = None, height: int = PREVIEW_HEIGHT,
+               crf: int = 30, preset: str = "ultrafast", threads: Optional[int] = None) -> str:
+    """Transcode input_path to a small H.264/AAC proxy.
+
+    Timestamps are preserved, so trims planned against the original can be
+    cut from the proxy unchanged. Sources shorter than height are not upscaled.
+    """
+    if not output_path:
+        output_path = str(proxy_path_for(input_path, height=height))
+    Path(output_path).parent.mkdir(parents=True, exist_ok=True)
+
+    output_args = {
+        "vcodec": "libx264",
+        "preset": preset,
+        "crf": crf,
+        "acodec": "aac",
+        "audio_bitrate": "96k",
+        "movflags": "+faststart",
+    }
+    if threads:
+        output_args["threads"] = threads
+    stream = ffmpeg.input(input_path)
+    stream = ffmpeg.output(stream, output_path, vf=f"scale=-2:'min({height},ih)'", **output_args)
+    with tracer.span("ffmpeg", label=Path(output_path).name, height=height) as span:
+        ffmpeg.run(stream, overwrite_output=True)
+        span.set(output_bytes=os.path.getsize(output_path))
+    return output_path
+
+
+def find_proxy(input_path: str, proxy_dir: str = "proxies", height: int = PREVIEW_HEIGHT) -> Optional[str]:
+    """Return an existing proxy of input_path that is newer than the source."""
+    proxy_path = proxy_path_for(input_path, proxy_dir, height)
+    try:
+        if proxy_path.stat().st_mtime >= os.stat(input_path).st_mtime:
+            return str(proxy_path)
+    except OSError:
+        pass
+    return None
+
+
+def preview_sources(sources: Dict[str, str], proxy_dir: str = "proxies") -> Dict[str, str]:
+    """Swap each source for its pre-generated proxy where one exists."""
+    return {video_id: find_proxy(path, proxy_dir) or path for video_id, path in sources.items()}
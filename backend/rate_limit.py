@@ -0,0 +1,163 @@
+import random
+import threading
+import time
+from typing import Callable, Dict, Optional, Set
+
+from tracing import tracer
+
+
+class TokenBucket:
+    """Thread-safe token bucket allowing `rate` calls per second with bursts up to `capacity`."""
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> None:
+        """Block until a token is available and take it."""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+class CallStats:
+    """Per-endpoint counters of calls, errors, retries and latency."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stats: Dict[str, Dict[str, float]] = {}
+
+    def record(self, name: str, latency: float, error: bool = False, retry: bool = False) -> None:
+        with self._lock:
+            entry = self._stats.setdefault(
+                name, {"calls": 0, "errors": 0, "retries": 0, "total_latency": 0.0, "max_latency": 0.0}
+            )
+            entry["calls"] += 1
+            entry["errors"] += int(error)
+            entry["retries"] += int(retry)
+            entry["total_latency"] += latency
+            entry["max_latency"] = max(entry["max_latency"], latency)
+
+    def snapshot(self) -> Dict[str, Dict[str, float]]:
+        """Copy of the counters, keyed by endpoint name."""
+        with self._lock:
+            return {name: dict(entry) for name, entry in self._stats.items()}
+
+    def summary(self) -> str:
+        """One line per endpoint for printing."""
+        lines = []
+        for name, entry in sorted(self.snapshot().items()):
+            average = entry["total_latency"] / entry["calls"] if entry["calls"] else 0
+            lines.append(
+                f"{name}: {entry['calls']} calls, {entry['errors']} errors, {entry['retries']} retries, "
+                f"avg {average:.2f}s, max {entry['max_latency']:.2f}s"
+            )
+        return "\n".join(lines)
+
+
+def _status_code(error: Exception) -> Optional[int]:
+    """HTTP status of an SDK error, if it carries one."""
+    status = getattr(error, "status_code", None)
+    if status is None:
+        status = getattr(getattr(error, "response", None), "status_code", None)
+    return status if isinstance(status, int) else None
+
+
+def _retry_after(error: Exception) -> Optional[float]:
+    """Seconds the server asked us to wait, from a Retry-After header."""
+    headers = getattr(getattr(error, "response", None), "headers", None) or {}
+    try:
+        return float(headers.get("retry-after"))
+    except (TypeError, ValueError):
+        return None
+
+
+def _is_transient(error: Exception) -> bool:
+    """Whether an error is a rate limit, a 5xx or a connection problem worth retrying."""
+    status = _status_code(error)
+    if status is not None:
+        return status == 429 or status >= 500
+    name = type(error).__name__
+    return isinstance(error, (ConnectionError, TimeoutError)) or "Connection" in name or "Timeout" in name
+
+
+class RateLimitedClient:
+    """Wraps an SDK client so every call is rate limited, retried and counted.
+
+    Calls are addressed as on the wrapped client, e.g. `client.search.query(...)`.
+    Calls named in `idempotent` are retried with jittered exponential backoff
+    on 429s, 5xx responses and connection errors; other calls are retried
+    only on 429, which the server rejects before doing any work. A
+    Retry-After from the server replaces the backoff and is never shortened.
+    """
+
+    def __init__(self, client, bucket: TokenBucket, idempotent: Set[str],
+                 max_retries: int = 4, base_delay: float = 0.5, max_delay: float = 30.0):
+        self._client = client
+        self.bucket = bucket
+        self.idempotent = idempotent
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.stats = CallStats()
+
+    def call(self, name: str, fn: Callable, *args, **kwargs):
+        """Call fn under the rate limit, retrying transient failures."""
+        with tracer.span(f"twelvelabs.{name}") as span:
+            return self._call(name, fn, span, *args, **kwargs)
+
+    def _call(self, name: str, fn: Callable, span, *args, **kwargs):
+        attempt = 0
+        while True:
+            self.bucket.acquire()
+            started = time.monotonic()
+            try:
+                result = fn(*args, **kwargs)
+            except Exception as e:
+                retryable = _is_transient(e) if name in self.idempotent else _status_code(e) == 429
+                will_retry = retryable and attempt < self.max_retries
+                self.stats.record(name, time.monotonic() - started, error=True, retry=will_retry)
+                if not will_retry:
+                    raise
+                retry_after = _retry_after(e)
+                if retry_after is not None:
+                    # Never earlier than the server asked; jitter only adds to it
+                    delay = retry_after + random.uniform(0, self.base_delay)
+                else:
+                    delay = min(self.max_delay, self.base_delay * 2 ** attempt) * random.uniform(0.5, 1.5)
+                print(f"Twelvelabs {name} failed ({str(e)}), retrying in {delay:.1f}s")
+                time.sleep(delay)
+                attempt += 1
+                span.set(retries=attempt)
+                continue
+            self.stats.record(name, time.monotonic() - started)
+            return result
+
+    def __getattr__(self, name: str):
+        return _ResourceProxy(self, name, getattr(self._client, name))
+
+
+class _ResourceProxy:
+    """Routes calls on one SDK resource (e.g. `client.task`) through RateLimitedClient.call."""
+
+    def __init__(self, owner: RateLimitedClient, resource: str, target):
+        self._owner = owner
+        self._resource = resource
+        self._target = target
+
+    def __getattr__(self, name: str):
+        attr = getattr(self._target, name)
+        if not callable(attr):
+            return attr
+        endpoint = f"{self._resource}.{name}"
+        return lambda *args, **kwargs: self._owner.call(endpoint, attr, *args, **kwargs)
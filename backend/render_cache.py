@@ -0,0 +1,99 @@
+import hashlib
+import json
+import os
+import shutil
+import threading
+from pathlib import Path
+from typing import Dict, Optional
+
+
+class SegmentCache:
+    """On-disk cache of rendered segments with size-bounded LRU eviction.
+
+    Entries are keyed by the source file (path, size and mtime), the trim
+    range and the settings the segment was encoded with, so an edited or
+    replaced source never serves a stale segment. Recency is tracked through
+    the mtime of the cached file, which is refreshed on every hit.
+    """
+
+    def __init__(self, cache_dir: str = "cache/segments", max_bytes: int = 5 * 1024 ** 3):
+        self.cache_dir = Path(cache_dir)
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+
+    def key(self, input_path: str, start_sec: float, end_sec: float, settings: Dict) -> str:
+        """Build the cache key for a segment of input_path."""
+        stat = os.stat(input_path)
+        payload = json.dumps({
+            "path": os.path.abspath(input_path),
+            "size": stat.st_size,
+            "mtime_ns": stat.st_mtime_ns,
+            "start": round(start_sec, 3),
+            "end": round(end_sec, 3),
+            "settings": settings,
+        }, sort_keys=True)
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    def _entry_paths(self, key: str, suffix: str):
+        return self.cache_dir / f"{key}{suffix}", self.cache_dir / f"{key}.json"
+
+    def get(self, key: str, dest: Path) -> Optional[str]:
+        """Materialize a cached segment at dest.
+
+        dest is hard-linked to the entry where possible, so it must be
+        deleted, not overwritten in place, before anything else is written there.
+
+        Returns:
+            Optional[str]: How the segment was originally rendered, or None on a miss
+        """
+        data_path, meta_path = self._entry_paths(key, dest.suffix)
+        with self._lock:
+            if not data_path.exists() or not meta_path.exists():
+                return None
+            try:
+                with open(meta_path) as f:
+                    method = json.load(f)["method"]
+                _link_or_copy(data_path, dest)
+                os.utime(data_path)
+            except (OSError, ValueError, KeyError) as e:
+                print(f"Warning: Ignoring unreadable cache entry {key}: {str(e)}")
+                return None
+        return method
+
+    def put(self, key: str, src: Path, method: str) -> None:
+        """Store a freshly rendered segment and evict old entries if needed."""
+        data_path, meta_path = self._entry_paths(key, src.suffix)
+        with self._lock:
+            try:
+                _link_or_copy(src, data_path)
+                with open(meta_path, "w") as f:
+                    json.dump({"method": method}, f)
+            except OSError as e:
+                print(f"Warning: Could not cache segment {src}: {str(e)}")
+                return
+            self._evict()
+
+    def _evict(self) -> None:
+        """Delete least recently used entries until the cache fits max_bytes."""
+        entries = [p for p in self.cache_dir.iterdir() if p.suffix != ".json"]
+        entries.sort(key=lambda p: p.stat().st_mtime)
+        total = sum(p.stat().st_size for p in entries)
+        for data_path in entries:
+            if total <= self.max_bytes:
+                break
+            total -= data_path.stat().st_size
+            data_path.unlink()
+            meta_path = data_path.with_suffix(".json")
+            if meta_path.exists():
+                meta_path.unlink()
+
+
+def _link_or_copy(src: Path, dest: Path) -> None:
+    """Hard-link src to dest, copying when linking is not possible."""
+    if dest.exists():
+        dest.unlink()
+    try:
+        os.link(src, dest)
+    except OSError:
+        shutil.copyfile(src, dest)
@@ -0,0 +1,99 @@
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, List, Optional
+
+
+def normalize_query(query: str) -> str:
+    """Lowercase a query and collapse its whitespace."""
+    return " ".join(query.lower().split())
+
+
+class SearchCache:
+    """Search results cached in an in-memory LRU and on disk, expiring after ttl seconds.
+
+    Keys include a per-index version number that is bumped whenever new
+    videos are indexed, so results from before an upload are never served.
+    cache_dir is only created when something is first written to it.
+    """
+
+    def __init__(self, cache_dir: str = "cache/search", ttl: float = 3600, max_entries: int = 256):
+        self.cache_dir = Path(cache_dir)
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._memory: "OrderedDict[str, Dict]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._versions_path = self.cache_dir / "versions.json"
+
+    def _versions(self) -> Dict[str, int]:
+        # Keyed by str(index_id): JSON would turn a None id into "null" on reload
+        try:
+            with open(self._versions_path) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def index_version(self, index_id: str) -> int:
+        """Current version of an index; it changes whenever videos are added."""
+        with self._lock:
+            return self._versions().get(str(index_id), 0)
+
+    def invalidate(self, index_id: str) -> None:
+        """Bump the index version so every cached search of it is stale."""
+        with self._lock:
+            versions = self._versions()
+            versions[str(index_id)] = versions.get(str(index_id), 0) + 1
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            with open(self._versions_path, "w") as f:
+                json.dump(versions, f)
+
+    def key(self, index_id: str, query: str, options: List[str], filters: Dict) -> str:
+        """Build the cache key of a search against the current index version."""
+        payload = json.dumps({
+            "index_id": index_id,
+            "query": normalize_query(query),
+            "options": sorted(options),
+            "filters": filters,
+            "index_version": self.index_version(index_id),
+        }, sort_keys=True)
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    def get(self, key: str) -> Optional[List[Dict]]:
+        """Return cached results for key, or None if missing or expired."""
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is None:
+                try:
+                    with open(self.cache_dir / f"{key}.json") as f:
+                        entry = json.load(f)
+                except (OSError, ValueError):
+                    return None
+            if time.time() - entry["created_at"] > self.ttl:
+                self._memory.pop(key, None)
+                (self.cache_dir / f"{key}.json").unlink(missing_ok=True)
+                return None
+            self._memory[key] = entry
+            self._memory.move_to_end(key)
+            self._trim()
+            return entry["results"]
+
+    def put(self, key: str, results: List[Dict]) -> None:
+        """Store results in memory and on disk."""
+        entry = {"created_at": time.time(), "results": results}
+        with self._lock:
+            self._memory[key] = entry
+            self._memory.move_to_end(key)
+            self._trim()
+            try:
+                self.cache_dir.mkdir(parents=True, exist_ok=True)
+                with open(self.cache_dir / f"{key}.json", "w") as f:
+                    json.dump(entry, f)
+            except (OSError, TypeError) as e:
+                print(f"Warning: Could not persist search results: {str(e)}")
+
+    def _trim(self) -> None:
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
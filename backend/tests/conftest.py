@@ -0,0 +1,19 @@
+"""Shared setup: every test runs against the offline stand-ins (see offline.py).
+
+The settings are read when twelve.py, prompt.py and main.py are imported,
+so they are set here, before any test module imports them.
+"""
+import os
+
+os.environ.update({
+    "REDUCT_OFFLINE": "1",
+    "OFFLINE_LATENCY": "0",
+    "OFFLINE_FAILURE_RATE": "0",
+    "OFFLINE_INDEX_TIME": "0",
+    "INDEX_POLL_INTERVAL": "0.01",
+    "SEARCH_CACHE_TTL": "0",
+    "SEGMENT_CACHE_MB": "0",
+    "TL_RATE_LIMIT": "1000",
+    "TL_RATE_BURST": "1000",
+})
+os.environ.pop("TRACE_FILE", None)
@@ -0,0 +1,38 @@
+import io
+
+from batch import read_jobs, validate_job
+
+
+def test_read_jobs_numbers_jobs_and_keeps_bad_lines_as_errors():
+    jobs = read_jobs(io.StringIO('{"prompt": "goals"}\n\n[1, 2]\nnot json\n{"id": "x", "prompt": "p"}\n'))
+    assert [job["id"] for job in jobs] == ["1", "3", "4", "x"]
+    assert "error" not in jobs[0]
+    assert jobs[1]["error"].startswith("Invalid JSON")
+    assert jobs[2]["error"].startswith("Invalid JSON")
+
+
+def test_valid_job(tmp_path):
+    video = tmp_path / "match.mp4"
+    video.write_bytes(b"")
+    job = {"prompt": "goals", "videos": [str(video)], "render": "both", "render_mode": "smart"}
+    assert validate_job(job) == []
+
+
+def test_invalid_jobs_report_every_problem(tmp_path):
+    problems = validate_job({"prompt": " ", "render": "draft", "render_mode": "fast",
+                             "videos": [str(tmp_path / "missing.mp4"), 3]})
+    assert problems == [
+        "missing prompt",
+        "render must be one of final, preview, both",
+        "render_mode must be one of reencode, copy, smart, filter",
+        f"video not found: {tmp_path / 'missing.mp4'}",
+        "video path must be a string: 3",
+    ]
+
+
+def test_videos_must_be_a_list():
+    assert validate_job({"prompt": "goals", "videos": "match.mp4"}) == ["videos must be a list of paths"]
+
+
+def test_parse_errors_are_reported_as_is():
+    assert validate_job({"id": "2", "error": "Invalid JSON: x"}) == ["Invalid JSON: x"]
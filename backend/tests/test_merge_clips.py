@@ -0,0 +1,31 @@
+from process_results import merge_clips
+
+
+def clip(video_id, start, end, score, thumbnail=None):
+    return {"video_id": video_id, "start_time": start, "end_time": end, "score": score,
+            "thumbnail_url": thumbnail or f"{video_id}/{start}.jpg"}
+
+
+def test_overlapping_and_near_clips_are_merged():
+    merged = merge_clips([clip("a", 0, 5, 0.8), clip("a", 4, 9, 0.9), clip("a", 9.5, 12, 0.7)], 1.0)
+    assert len(merged) == 1
+    assert (merged[0]["start_time"], merged[0]["end_time"]) == (0, 12)
+    # The best score and its thumbnail are kept
+    assert merged[0]["score"] == 0.9
+    assert merged[0]["thumbnail_url"] == "a/4.jpg"
+
+
+def test_clips_further_apart_than_the_gap_stay_separate():
+    merged = merge_clips([clip("a", 0, 5, 0.8), clip("a", 7, 9, 0.9)], 1.0)
+    assert [(c["start_time"], c["end_time"]) for c in merged] == [(7, 9), (0, 5)]
+
+
+def test_clips_of_different_videos_are_never_merged():
+    merged = merge_clips([clip("a", 0, 5, 0.8), clip("b", 0, 5, 0.9)], 1.0)
+    assert [c["video_id"] for c in merged] == ["b", "a"]
+
+
+def test_input_clips_are_not_modified():
+    clips = [clip("a", 0, 5, 0.8), clip("a", 3, 8, 0.9)]
+    merge_clips(clips, 1.0)
+    assert clips[0]["end_time"] == 5
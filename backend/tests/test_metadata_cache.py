@@ -0,0 +1,65 @@
+import metadata_cache
+from metadata_cache import MetadataCache
+from offline import FaultInjector, OfflineCollection
+
+
+def collections(count=0):
+    faults = FaultInjector()
+    metadata = OfflineCollection("metadata", faults)
+    for i in range(count):
+        metadata.insert_one({"video_id": f"v{i}", "original_path": f"/videos/{i}.mp4",
+                             "fingerprint": f"fp{i}"})
+    return metadata, OfflineCollection("state", faults)
+
+
+def no_query(*args, **kwargs):
+    raise AssertionError("the collection should not be queried")
+
+
+def test_complete_cache_answers_misses_without_querying(monkeypatch):
+    metadata, state = collections(3)
+    cache = MetadataCache(metadata, state)
+    assert set(cache.get_many(["v0", "v2", "unknown"])) == {"v0", "v2"}
+    monkeypatch.setattr(metadata, "find", no_query)
+    assert cache.get_many(["unknown"]) == {}
+    assert cache.find_by_fingerprint("fp1")["video_id"] == "v1"
+
+
+def test_evicted_entries_are_looked_up_in_the_collection():
+    metadata, state = collections(5)
+    cache = MetadataCache(metadata, state, max_entries=2)
+    found = cache.get_many(["v0", "v1", "v2", "v3", "v4"])
+    assert set(found) == {"v0", "v1", "v2", "v3", "v4"}
+    # Only the most recently used entries stay in memory
+    assert list(cache._entries) == ["v3", "v4"]
+    assert cache.find_by_fingerprint("fp0")["video_id"] == "v0"
+
+
+def test_writes_of_another_process_are_picked_up_after_the_check_interval(monkeypatch):
+    clock = [100.0]
+    monkeypatch.setattr(metadata_cache.time, "monotonic", lambda: clock[0])
+    metadata, state = collections(1)
+    cache = MetadataCache(metadata, state, check_interval=5)
+    writer = MetadataCache(metadata, state)
+    assert cache.get_many(["v0"])
+
+    metadata.insert_one({"video_id": "new", "original_path": "/videos/new.mp4"})
+    writer.update([{"video_id": "new", "original_path": "/videos/new.mp4"}])
+    # Still within the check interval, so the cache does not look yet
+    clock[0] += 4
+    assert cache.get_many(["new"]) == {}
+    clock[0] += 1
+    assert cache.get_many(["new"])["new"]["original_path"] == "/videos/new.mp4"
+
+
+def test_own_writes_do_not_force_a_reload(monkeypatch):
+    metadata, state = collections(1)
+    cache = MetadataCache(metadata, state, check_interval=0)
+    cache.get_many(["v0"])
+    metadata.insert_one({"video_id": "v1", "original_path": "/videos/1.mp4", "fingerprint": "fp1"})
+    cache.update([{"video_id": "v1", "original_path": "/videos/1.mp4", "fingerprint": "fp1"}])
+
+    loads = []
+    monkeypatch.setattr(cache, "load", lambda: loads.append(True))
+    assert cache.find_by_fingerprint("fp1")["video_id"] == "v1"
+    assert loads == []
@@ -0,0 +1,82 @@
+"""process_edit end to end against the offline services, with the FFmpeg render stubbed out."""
+import asyncio
+from pathlib import Path
+
+import pytest
+
+import main
+import twelve
+
+
+@pytest.fixture
+def editor(tmp_path, monkeypatch):
+    # The editor's output, temp and cache directories are relative to the working directory
+    monkeypatch.chdir(tmp_path)
+    main.reset_offline_services()
+    return main.VideoEditor(render_mode="copy")
+
+
+@pytest.fixture
+def renders(monkeypatch):
+    """Replace generate_ffmpeg_from_plan with a stub writing a placeholder output."""
+    calls = []
+
+    def render(edit_plan, sources, output_path, mode="reencode", preview=False, **kwargs):
+        calls.append({"plan": edit_plan, "sources": dict(sources), "mode": mode, "preview": preview})
+        Path(output_path).write_bytes(b"rendered")
+        return output_path
+
+    monkeypatch.setattr(main, "generate_ffmpeg_from_plan", render)
+    return calls
+
+
+def videos(tmp_path, count=2):
+    paths = []
+    for i in range(count):
+        path = tmp_path / f"video{i}.mp4"
+        path.write_bytes(bytes([i]) * 4096)
+        paths.append(str(path))
+    return paths
+
+
+def test_edit_uploads_searches_plans_and_renders(editor, renders, tmp_path):
+    paths = videos(tmp_path)
+    result = asyncio.run(editor.process_edit("Cut the goals together", paths, approve="both"))
+
+    assert result["status"] == "done", result.get("error")
+    assert all(editor.video_metadata[path].status == main.VideoStatus.READY for path in paths)
+    assert result["clips"] > 0 and result["trims"] > 0
+    assert Path(result["preview"]).read_bytes() == b"rendered"
+    assert Path(result["output"]).read_bytes() == b"rendered"
+
+    preview, final = renders
+    assert (preview["preview"], final["preview"]) == (True, False)
+    assert final["mode"] == "copy"
+    # Every trim is resolved to one of the uploaded files
+    trims = [action for action in final["plan"]["actions"] if action["type"] == "trim"]
+    assert len(trims) == result["trims"]
+    assert {final["sources"][action["video_id"]] for action in trims} <= set(paths)
+    assert {"ingest", "search", "render"} <= set(result["timings"])
+
+
+def test_uploaded_videos_are_not_uploaded_again(editor, renders, tmp_path):
+    paths = videos(tmp_path, 1)
+    asyncio.run(editor.process_edit("goals", paths, approve="final"))
+
+    # A new editor recognizes the file by its fingerprint
+    again = main.VideoEditor()
+    result = asyncio.run(again.process_edit("goals", paths, approve="final"))
+    assert result["status"] == "done"
+    assert again.video_metadata[paths[0]].status == main.VideoStatus.READY
+    assert len(twelve._sdk_client.tasks) == 1
+    assert len(main.db_client[main.DB_NAME]["metadata"].find({})) == 1
+
+
+def test_render_failure_is_reported(editor, monkeypatch, tmp_path):
+    def fail(*args, **kwargs):
+        raise RuntimeError("ffmpeg exited with 1")
+
+    monkeypatch.setattr(main, "generate_ffmpeg_from_plan", fail)
+    result = asyncio.run(editor.process_edit("goals", videos(tmp_path, 1), approve="final"))
+    assert result["status"] == "render_error"
+    assert "ffmpeg exited with 1" in result["error"]
@@ -0,0 +1,90 @@
+import time
+from types import SimpleNamespace
+
+import pytest
+
+import rate_limit
+from rate_limit import RateLimitedClient, TokenBucket
+
+
+class APIError(Exception):
+    def __init__(self, status_code, retry_after=None):
+        super().__init__(f"status {status_code}")
+        headers = {"retry-after": str(retry_after)} if retry_after is not None else {}
+        self.response = SimpleNamespace(status_code=status_code, headers=headers)
+
+
+def flaky(*errors, result="ok"):
+    """A call failing with the given errors in turn, then returning result."""
+    remaining = list(errors)
+    calls = []
+
+    def call(*args, **kwargs):
+        calls.append(args)
+        if remaining:
+            raise remaining.pop(0)
+        return result
+    call.calls = calls
+    return call
+
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    """Record backoff sleeps instead of waiting."""
+    recorded = []
+    monkeypatch.setattr(rate_limit.time, "sleep", recorded.append)
+    return recorded
+
+
+def make_client(fn, idempotent=("search.query",), **kwargs):
+    sdk = SimpleNamespace(search=SimpleNamespace(query=fn), task=SimpleNamespace(create=fn))
+    return RateLimitedClient(sdk, TokenBucket(rate=1000, capacity=1000), set(idempotent), **kwargs)
+
+
+def test_bucket_allows_a_burst_then_throttles_to_the_rate():
+    bucket = TokenBucket(rate=50, capacity=5)
+    started = time.monotonic()
+    for _ in range(5):
+        bucket.acquire()
+    assert time.monotonic() - started < 0.05
+    for _ in range(5):
+        bucket.acquire()
+    # Five more tokens at 50/s take about 0.1s
+    assert time.monotonic() - started >= 0.08
+
+
+def test_idempotent_calls_are_retried_on_5xx(sleeps):
+    fn = flaky(APIError(503), APIError(500))
+    client = make_client(fn)
+    assert client.search.query("q") == "ok"
+    assert len(fn.calls) == 3
+    assert len(sleeps) == 2
+    assert client.stats.snapshot()["search.query"]["retries"] == 2
+
+
+def test_other_calls_are_retried_only_on_429(sleeps):
+    client = make_client(flaky(APIError(429)))
+    assert client.task.create("f") == "ok"
+    client = make_client(flaky(APIError(500)))
+    with pytest.raises(APIError):
+        client.task.create("f")
+
+
+def test_client_errors_are_not_retried(sleeps):
+    fn = flaky(APIError(400))
+    with pytest.raises(APIError):
+        make_client(fn).search.query("q")
+    assert len(fn.calls) == 1
+    assert sleeps == []
+
+
+def test_retry_after_is_never_shortened(sleeps):
+    make_client(flaky(APIError(429, retry_after=7)), base_delay=0.5).search.query("q")
+    assert 7 <= sleeps[0] <= 7.5
+
+
+def test_retries_give_up_after_max_retries(sleeps):
+    fn = flaky(*[APIError(503)] * 5)
+    with pytest.raises(APIError):
+        make_client(fn, max_retries=2).search.query("q")
+    assert len(fn.calls) == 3
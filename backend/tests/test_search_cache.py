@@ -0,0 +1,53 @@
+import time
+
+from search_cache import SearchCache, normalize_query
+
+RESULTS = [{"video_id": "v1", "start_time": 0, "end_time": 5, "score": 0.9}]
+
+
+def make_cache(tmp_path, **kwargs):
+    return SearchCache(cache_dir=str(tmp_path / "search"), **kwargs)
+
+
+def test_results_are_served_from_disk_until_they_expire(tmp_path, monkeypatch):
+    cache = make_cache(tmp_path, ttl=60)
+    key = cache.key("index", "Goals", ["visual"], {})
+    cache.put(key, RESULTS)
+    # A new instance only has the files to go on
+    assert make_cache(tmp_path, ttl=60).get(key) == RESULTS
+
+    now = time.time()
+    monkeypatch.setattr(time, "time", lambda: now + 61)
+    assert cache.get(key) is None
+    assert not (tmp_path / "search" / f"{key}.json").exists()
+
+
+def test_invalidate_changes_the_keys_of_that_index_only(tmp_path):
+    cache = make_cache(tmp_path)
+    key = cache.key("index", "goals", ["visual"], {})
+    other = cache.key("other", "goals", ["visual"], {})
+    cache.put(key, RESULTS)
+    cache.invalidate("index")
+    assert cache.key("index", "goals", ["visual"], {}) != key
+    assert cache.key("other", "goals", ["visual"], {}) == other
+
+
+def test_invalidate_works_without_an_index_id(tmp_path):
+    cache = make_cache(tmp_path)
+    key = cache.key(None, "goals", [], {})
+    cache.invalidate(None)
+    assert make_cache(tmp_path).key(None, "goals", [], {}) != key
+
+
+def test_queries_differing_in_case_and_spacing_share_a_key(tmp_path):
+    cache = make_cache(tmp_path)
+    assert normalize_query("  Big   Goals ") == "big goals"
+    assert cache.key("i", "Big  Goals", ["audio", "visual"], {}) == cache.key("i", "big goals", ["visual", "audio"], {})
+
+
+def test_directory_is_created_on_first_write(tmp_path):
+    cache = make_cache(tmp_path)
+    assert cache.get(cache.key("i", "q", [], {})) is None
+    assert not (tmp_path / "search").exists()
+    cache.put("k", RESULTS)
+    assert (tmp_path / "search" / "k.json").exists()
@@ -0,0 +1,137 @@
+import contextvars
+import json
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from contextlib import ExitStack, contextmanager
+from pathlib import Path
+from typing import Callable, ContextManager, Dict, Iterator, List, Optional
+
+# Innermost open span of the current thread or asyncio task
+_current_span: contextvars.ContextVar[Optional["Span"]] = contextvars.ContextVar("current_span", default=None)
+
+# Traces kept in memory for summaries; older ones are dropped unsummarized
+MAX_TRACES = 32
+
+
+class Span:
+    """One timed operation; attributes such as sizes can be added while it runs."""
+
+    def __init__(self, name: str, parent: Optional["Span"], attributes: Dict):
+        self.name = name
+        self.trace_id = parent.trace_id if parent else uuid.uuid4().hex[:16]
+        self.span_id = uuid.uuid4().hex[:16]
+        self.parent_id = parent.span_id if parent else None
+        self.attributes = attributes
+        self.start = time.time()
+        self.duration: Optional[float] = None
+        self.error: Optional[str] = None
+
+    def set(self, **attributes) -> None:
+        self.attributes.update(attributes)
+
+    def to_dict(self) -> Dict:
+        return {
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "start": self.start,
+            "duration": self.duration,
+            "error": self.error,
+            "thread": threading.current_thread().name,
+            "attributes": self.attributes,
+        }
+
+
+class Tracer:
+    """Records nested spans and appends each finished one to a JSONL file.
+
+    Spans opened inside another span, in the same thread, asyncio task or
+    a thread started with the task's context (asyncio.to_thread), share
+    its trace_id, so one edit can be summarized on its own.
+
+    Hooks added with add_hook are called with every span as it opens; a
+    context manager a hook returns is held open around the span's body.
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = Path(path) if path else None
+        self._traces: "OrderedDict[str, List[Span]]" = OrderedDict()
+        self._hooks: List[Callable[[Span], Optional[ContextManager]]] = []
+        self._lock = threading.Lock()
+
+    def add_hook(self, hook: Callable[[Span], Optional[ContextManager]]) -> None:
+        """Call hook with every span opened from now on, e.g. to meter some of them."""
+        self._hooks.append(hook)
+
+    def remove_hook(self, hook: Callable[[Span], Optional[ContextManager]]) -> None:
+        self._hooks.remove(hook)
+
+    @contextmanager
+    def span(self, name: str, **attributes) -> Iterator[Span]:
+        span = Span(name, _current_span.get(), attributes)
+        token = _current_span.set(span)
+        started = time.perf_counter()
+        try:
+            with ExitStack() as hooks:
+                for hook in list(self._hooks):
+                    context = hook(span)
+                    if context is not None:
+                        hooks.enter_context(context)
+                yield span
+        except BaseException as e:
+            span.error = f"{type(e).__name__}: {str(e)}"
+            raise
+        finally:
+            span.duration = round(time.perf_counter() - started, 6)
+            _current_span.reset(token)
+            self._record(span)
+
+    def _record(self, span: Span) -> None:
+        with self._lock:
+            self._traces.setdefault(span.trace_id, []).append(span)
+            while len(self._traces) > MAX_TRACES:
+                self._traces.popitem(last=False)
+            if self.path is None:
+                return
+            try:
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+                with open(self.path, "a") as f:
+                    f.write(json.dumps(span.to_dict(), default=str) + "\n")
+            except OSError as e:
+                print(f"Warning: Could not write trace: {str(e)}")
+
+    def totals(self, trace_id: str) -> Dict[str, Dict]:
+        """Count, total and max duration and errors per span name in one trace; the trace is then forgotten."""
+        with self._lock:
+            spans = self._traces.pop(trace_id, [])
+        totals: Dict[str, Dict] = {}
+        for span in spans:
+            entry = totals.setdefault(span.name, {"count": 0, "total": 0.0, "max": 0.0, "errors": 0})
+            entry["count"] += 1
+            entry["total"] += span.duration or 0.0
+            entry["max"] = max(entry["max"], span.duration or 0.0)
+            entry["errors"] += int(span.error is not None)
+        return totals
+
+    def summary(self, trace_id: str, totals: Optional[Dict[str, Dict]] = None) -> str:
+        """Time spent per span name in one trace, slowest first.
+
+        Without totals they are collected, and the trace forgotten, first.
+        """
+        if totals is None:
+            totals = self.totals(trace_id)
+        lines = [f"Trace {trace_id}:"]
+        for name, entry in sorted(totals.items(), key=lambda item: item[1]["total"], reverse=True):
+            errors = f", {entry['errors']} failed" if entry["errors"] else ""
+            lines.append(f"  {name:<22} {entry['count']:>4}x {entry['total']:9.3f}s total, "
+                         f"max {entry['max']:.3f}s{errors}")
+        return "\n".join(lines)
+
+
+# Finished spans are appended to TRACE_FILE when it is set; otherwise they are
+# only kept in memory for the end-of-edit summary
+tracer = Tracer(os.getenv("TRACE_FILE") or None)
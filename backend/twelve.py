@@ -1,9 +1,15 @@
 import os
-from twelvelabs import TwelveLabs
+from typing import TYPE_CHECKING, Dict, Iterator, Optional
 from glob import glob
-from twelvelabs.models.task import Task
-from twelvelabs.models.search import SearchData, GroupByVideoSearchData
 from dotenv import load_dotenv
+from search_cache import SearchCache
+from rate_limit import RateLimitedClient, TokenBucket
+from offline import OFFLINE, OfflineTwelveLabs
+from lazy import LazyClient
+
+if TYPE_CHECKING:
+    from twelvelabs.models.task import Task
+    from twelvelabs.models.search import SearchData
 
 # Load environment variables from .env file
 load_dotenv()
@@ -11,7 +17,39 @@ load_dotenv()
 INDEX_ID = os.getenv("INDEX_ID")
 GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
 
-client = TwelveLabs(api_key=os.getenv("TL_API_KEY"))
+# All uploads and searches share one token bucket, so parallel jobs stay
+# under the account's request quota
+api_rate_limit = TokenBucket(
+    rate=float(os.getenv("TL_RATE_LIMIT", "5")),
+    capacity=float(os.getenv("TL_RATE_BURST", "10")),
+)
+
+def _make_client():
+    # REDUCT_OFFLINE=1 swaps in a local stand-in; see offline.py
+    if OFFLINE:
+        return OfflineTwelveLabs()
+    from twelvelabs import TwelveLabs
+    return TwelveLabs(api_key=os.getenv("TL_API_KEY"))
+
+
+# The SDK is imported and the client built on the first API call
+_sdk_client = LazyClient(_make_client)
+client = RateLimitedClient(
+    _sdk_client,
+    api_rate_limit,
+    idempotent={"task.retrieve", "search.query", "search.by_page_token", "index.retrieve"},
+)
+
+# Repeated searches are served locally until they expire or new videos are
+# indexed; SEARCH_CACHE_TTL=0 disables the cache
+SEARCH_CACHE_TTL = float(os.getenv("SEARCH_CACHE_TTL", "3600"))
+search_cache = SearchCache(ttl=SEARCH_CACHE_TTL) if SEARCH_CACHE_TTL > 0 else None
+
+SEARCH_OPTIONS = ["visual", "audio"]
+# Results per page, and how many clips search_video collects across pages
+SEARCH_PAGE_LIMIT = int(os.getenv("SEARCH_PAGE_LIMIT", "10"))
+SEARCH_TOP_K = int(os.getenv("SEARCH_TOP_K", "20"))
+SEARCH_FILTERS = {"group_by": "clip", "operator": "or", "page_limit": SEARCH_PAGE_LIMIT, "sort_option": "score"}
 
 
 def validate_video_path(video_path):
@@ -23,13 +61,23 @@ def validate_video_path(video_path):
         raise FileNotFoundError(f"No videos found in the path {video_path}.")
     return video_path
 
-def upload_video(video_path):
+def create_upload_task(video_path) -> "Task":
+    """Upload a video and start indexing it without waiting for the index."""
     validated_path = validate_video_path(video_path)
     task = client.task.create(index_id=INDEX_ID, file=validated_path)
     print(f"Task id={task.id}")
+    return task
+
+def get_task(task_id) -> "Task":
+    """Fetch the current state of an indexing task."""
+    return client.task.retrieve(task_id)
+
+def upload_video(video_path):
+    validated_path = validate_video_path(video_path)
+    task = create_upload_task(validated_path)
     # (Optional) Monitor the video indexing process
     # Utility function to print the status of a video indexing task
-    def on_task_update(task: Task):
+    def on_task_update(task: "Task"):
         print(f"  Status={task.status}")
 
     task.wait_for_done(callback=on_task_update)
@@ -41,7 +89,7 @@ def upload_video(video_path):
     video_id = task.video_id
     return video_id
 
-def print_search_data(data: SearchData):
+def print_search_data(data: "SearchData"):
     return {
         'score': data.score,
         'start_time': data.start,
@@ -50,34 +98,73 @@ def print_search_data(data: SearchData):
         'thumbnail_url': data.thumbnail_url
     }
 
-def search_video(user_query):
-    user_query = user_query.strip()
-    user_query = user_query.lower()
+def iter_search(user_query: str, min_score: Optional[float] = None, top_k: Optional[int] = None,
+                **params) -> Iterator[Dict]:
+    """Lazily yield clips for a query, fetching result pages only as they are needed.
+
+    Results come sorted by score, so the walk stops at the first clip below
+    min_score (clips grouped by video are skipped instead, as groups are
+    not globally sorted) or once top_k clips have been yielded.
+
+    Args:
+        user_query (str): The search query
+        min_score (float, optional): Lowest score to yield
+        top_k (int, optional): Most clips to yield
+        **params: Extra arguments for client.search.query, e.g. video_id
+
+    Yields:
+        Dict: Clip details as returned by print_search_data
+    """
     result = client.search.query(
         index_id=INDEX_ID,
-        options=["visual", "audio"],
+        options=SEARCH_OPTIONS,
         query_text=user_query,
-        group_by="clip",
-        operator="or",
-        page_limit=5,
-        sort_option="score",
+        **{**SEARCH_FILTERS, **params},
     )
-    
+    yielded = 0
+    while True:
+        for item in result.data:
+            grouped = hasattr(item, 'clips')  # GroupByVideoSearchData
+            for clip in (item.clips or []) if grouped else [item]:
+                clip_data = print_search_data(clip)
+                if min_score is not None and clip_data['score'] < min_score:
+                    if grouped:
+                        continue
+                    return
+                yield clip_data
+                yielded += 1
+                if top_k is not None and yielded >= top_k:
+                    return
+
+        next_page_token = getattr(getattr(result, "page_info", None), "next_page_token", None)
+        if not next_page_token:
+            return
+        result = client.search.by_page_token(page_token=next_page_token)
+
+def search_video(user_query):
+    user_query = user_query.strip()
+    user_query = user_query.lower()
+
+    cache_key = None
+    if search_cache is not None:
+        cache_key = search_cache.key(INDEX_ID, user_query, SEARCH_OPTIONS,
+                                     {**SEARCH_FILTERS, "top_k": SEARCH_TOP_K})
+        cached = search_cache.get(cache_key)
+        if cached is not None:
+            print(f"\nUsing cached results for query: {user_query}")
+            return cached
+
     all_clips = []
     highest_score = 0
     
-    # Collect all clips and find highest score
-    for item in result.data:
-        if isinstance(item, GroupByVideoSearchData):
-            if item.clips:
-                for clip in item.clips:
-                    clip_data = print_search_data(clip)
-                    all_clips.append(clip_data)
-                    highest_score = max(highest_score, clip_data['score'])
-        else:
-            clip_data = print_search_data(item)
-            all_clips.append(clip_data)
-            highest_score = max(highest_score, clip_data['score'])
+    # Collect clips page by page and find highest score
+    for clip_data in iter_search(user_query, top_k=SEARCH_TOP_K):
+        # Once a "high" clip was seen the rest are filtered out below, and
+        # since results are sorted no later page can add a high one
+        if highest_score > 0.7 and clip_data['score'] < 0.7:
+            break
+        all_clips.append(clip_data)
+        highest_score = max(highest_score, clip_data['score'])
     
     # Filter clips based on score
     if highest_score > 0.7:  # Consider scores above 0.7 as "high"
@@ -92,6 +179,16 @@ def search_video(user_query):
         print(f"  Score: {clip['score']}")
         print(f"  Thumbnail URL: {clip['thumbnail_url']}")
         print(f"  Video ID: {clip['video_id']}")
-    
+
+    if cache_key is not None:
+        search_cache.put(cache_key, all_clips)
     return all_clips
 
+
+def reset_offline() -> None:
+    """Forget every task, indexed video and cached search of the offline stand-in."""
+    if not OFFLINE:
+        raise RuntimeError("Only the offline Twelvelabs stand-in can be reset")
+    _sdk_client.reset()
+    if search_cache is not None:
+        search_cache.invalidate(INDEX_ID)